@@ -0,0 +1,51 @@
+"""
+Time of DELETE /users/<id> for users with `--favorites` favorites each (half
+characters, half planets), on a SQLite file seeded by seed.py. Also checks that
+the favorites went with the user and that no favorite counter drifted.
+
+    $ python bench/cascade_delete.py --favorites 10000 --users 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:////tmp/starwars_cascade.db")
+os.environ.setdefault("ADMIN_ENABLED", "false")
+
+from seed import seed
+from app import app
+from models import db, Favorite
+from counters import rebuild_counters
+
+def run(users, favorites):
+    with app.app_context():
+        volumes = seed(users, favorites // 2, favorites - favorites // 2, favorites)
+
+    client = app.test_client()
+    timings = []
+    for user_id in range(1, users + 1):
+        start = time.perf_counter()
+        response = client.delete(f"/users/{user_id}")
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data()
+
+    with app.app_context():
+        left = db.session.scalar(db.select(db.func.count()).select_from(Favorite))
+        drift = {name: drifted for name, drifted in rebuild_counters(repair=False).items() if drifted}
+    return {"database": app.config["SQLALCHEMY_DATABASE_URI"], "volumes": volumes,
+            "delete_user_ms": {"p50": round(statistics.median(timings), 2), "max": round(max(timings), 2)},
+            "favorites_left": left, "counter_drift": drift}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--favorites", type=int, default=10_000, help="favorites of every user")
+    args = parser.parse_args()
+    print(json.dumps(run(args.users, args.favorites), indent=2))
@@ -0,0 +1,57 @@
+"""
+Favorites lookup latency with and without the indexes added in migration 3f1c9b7d2e4a.
+Seeds a SQLite database with `--rows` character favorites and times the two
+lookups app.py runs: all favorites of a user, and one (user_id, character_id) pair.
+
+    $ python bench/favorites_index.py --rows 1000000
+"""
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import time
+
+def seed(connection, rows, users, characters):
+    connection.execute("CREATE TABLE character_fav (id INTEGER PRIMARY KEY, character_id INTEGER NOT NULL, user_id INTEGER NOT NULL)")
+    pairs = set()
+    while len(pairs) < rows:
+        pairs.add((random.randint(1, users), random.randint(1, characters)))
+    connection.executemany("INSERT INTO character_fav (user_id, character_id) VALUES (?, ?)", pairs)
+    connection.commit()
+    return list(pairs)
+
+def time_lookups(connection, sql, params_list):
+    timings = []
+    for params in params_list:
+        start = time.perf_counter()
+        connection.execute(sql, params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": round(statistics.median(timings), 4), "max_ms": round(max(timings), 4)}
+
+def run(rows, users, characters, lookups):
+    random.seed(42)
+    connection = sqlite3.connect(":memory:")
+    pairs = seed(connection, rows, users, characters)
+    samples = random.sample(pairs, lookups)
+    by_user = ("SELECT id, character_id FROM character_fav WHERE user_id = ?", [(user_id,) for user_id, _ in samples])
+    by_pair = ("SELECT id FROM character_fav WHERE user_id = ? AND character_id = ?", samples)
+
+    results = {"rows": rows, "lookups": lookups, "without_indexes": {}, "with_indexes": {}}
+    results["without_indexes"]["favorites_of_user"] = time_lookups(connection, *by_user)
+    results["without_indexes"]["favorite_pair"] = time_lookups(connection, *by_pair)
+
+    connection.execute("CREATE UNIQUE INDEX ix_character_fav_user_id_character_id ON character_fav (user_id, character_id)")
+    connection.execute("CREATE INDEX ix_character_fav_character_id ON character_fav (character_id)")
+    results["with_indexes"]["favorites_of_user"] = time_lookups(connection, *by_user)
+    results["with_indexes"]["favorite_pair"] = time_lookups(connection, *by_pair)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--characters", type=int, default=5_000)
+    parser.add_argument("--lookups", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.users, args.characters, args.lookups), indent=2))
@@ -0,0 +1,83 @@
+"""
+A user's favorites read from the two per-entity tables (one query per table, as app.py
+did before migration c6e1d0b3f274) and from the single favorite table (one range scan of
+its (user_id, entity_type, entity_id) index). Both layouts hold the same favorites in an
+in-memory SQLite, the query plans are printed with the timings.
+
+    $ python bench/favorites_table.py --favorites-per-user 50
+"""
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import time
+
+SCHEMA = """
+CREATE TABLE character (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE planet (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE character_fav (id INTEGER PRIMARY KEY, character_id INTEGER NOT NULL, user_id INTEGER NOT NULL);
+CREATE UNIQUE INDEX ix_character_fav_user_id_character_id ON character_fav (user_id, character_id);
+CREATE TABLE planet_fav (id INTEGER PRIMARY KEY, planet_id INTEGER NOT NULL, user_id INTEGER NOT NULL);
+CREATE UNIQUE INDEX ix_planet_fav_user_id_planet_id ON planet_fav (user_id, planet_id);
+CREATE TABLE favorite (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, entity_type TEXT NOT NULL, entity_id INTEGER NOT NULL);
+CREATE UNIQUE INDEX ix_favorite_user_id_entity_type_entity_id ON favorite (user_id, entity_type, entity_id);
+"""
+
+TWO_TABLES = [
+    "SELECT character_fav.id, character_fav.character_id, character.name FROM character_fav "
+    "JOIN character ON character.id = character_fav.character_id WHERE character_fav.user_id = ?",
+    "SELECT planet_fav.id, planet_fav.planet_id, planet.name FROM planet_fav "
+    "JOIN planet ON planet.id = planet_fav.planet_id WHERE planet_fav.user_id = ?",
+]
+
+ONE_TABLE = [
+    "SELECT favorite.id, favorite.entity_type, favorite.entity_id, coalesce(character.name, planet.name) AS name "
+    "FROM favorite "
+    "LEFT OUTER JOIN character ON favorite.entity_type = 'character' AND character.id = favorite.entity_id "
+    "LEFT OUTER JOIN planet ON favorite.entity_type = 'planet' AND planet.id = favorite.entity_id "
+    "WHERE favorite.user_id = ? AND coalesce(character.name, planet.name) IS NOT NULL "
+    "ORDER BY favorite.entity_type, favorite.entity_id",
+]
+
+def seed(connection, users, characters, planets, favorites_per_user):
+    connection.executescript(SCHEMA)
+    connection.executemany("INSERT INTO character (id, name) VALUES (?, ?)", [(i, f"Character {i}") for i in range(1, characters + 1)])
+    connection.executemany("INSERT INTO planet (id, name) VALUES (?, ?)", [(i, f"Planet {i}") for i in range(1, planets + 1)])
+    for user_id in range(1, users + 1):
+        character_ids = random.sample(range(1, characters + 1), favorites_per_user // 2)
+        planet_ids = random.sample(range(1, planets + 1), favorites_per_user - favorites_per_user // 2)
+        connection.executemany("INSERT INTO character_fav (user_id, character_id) VALUES (?, ?)", [(user_id, i) for i in character_ids])
+        connection.executemany("INSERT INTO planet_fav (user_id, planet_id) VALUES (?, ?)", [(user_id, i) for i in planet_ids])
+        connection.executemany("INSERT INTO favorite (user_id, entity_type, entity_id) VALUES (?, 'character', ?)", [(user_id, i) for i in character_ids])
+        connection.executemany("INSERT INTO favorite (user_id, entity_type, entity_id) VALUES (?, 'planet', ?)", [(user_id, i) for i in planet_ids])
+    connection.commit()
+
+def time_reads(connection, statements, user_ids):
+    timings = []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        rows = [row for sql in statements for row in connection.execute(sql, (user_id,)).fetchall()]
+        timings.append((time.perf_counter() - start) * 1000)
+    plans = [detail for sql in statements for *_, detail in connection.execute("EXPLAIN QUERY PLAN " + sql, (1,))]
+    return {"queries": len(statements), "rows": len(rows), "p50_ms": round(statistics.median(timings), 4),
+            "max_ms": round(max(timings), 4), "plan": plans}
+
+def run(users, characters, planets, favorites_per_user, lookups):
+    random.seed(42)
+    connection = sqlite3.connect(":memory:")
+    seed(connection, users, characters, planets, favorites_per_user)
+    user_ids = [random.randint(1, users) for _ in range(lookups)]
+    return {"users": users, "favorites_per_user": favorites_per_user, "lookups": lookups,
+            "two_tables": time_reads(connection, TWO_TABLES, user_ids),
+            "one_table": time_reads(connection, ONE_TABLE, user_ids)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--characters", type=int, default=5_000)
+    parser.add_argument("--planets", type=int, default=1_000)
+    parser.add_argument("--favorites-per-user", type=int, default=50)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.users, args.characters, args.planets, args.favorites_per_user, args.lookups), indent=2))
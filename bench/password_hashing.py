@@ -0,0 +1,79 @@
+"""
+Signup throughput (POST /users) and login latency at different password hashing costs.
+Every setting swaps the hasher of the app, then signs up --signups users from
+--concurrency client threads through the Flask test client.
+
+    $ python bench/password_hashing.py --signups 200 --concurrency 8
+    $ PASSWORD_HASH_WORKERS=2 python bench/password_hashing.py
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+DEFAULT_DATABASE_URL = "sqlite:////tmp/starwars_passwords.db"
+
+SETTINGS = [
+    ("scrypt n=2^12", {"algorithm": "scrypt", "scrypt_n": 2 ** 12}),
+    ("scrypt n=2^14 (default)", {"algorithm": "scrypt", "scrypt_n": 2 ** 14}),
+    ("scrypt n=2^15", {"algorithm": "scrypt", "scrypt_n": 2 ** 15}),
+    ("pbkdf2 100000", {"algorithm": "pbkdf2", "pbkdf2_iterations": 100000}),
+    ("pbkdf2 600000", {"algorithm": "pbkdf2", "pbkdf2_iterations": 600000}),
+]
+
+def run_setting(app, index, name, options, signups, concurrency, workers):
+    import app as app_module
+    from passwords import PasswordHasher
+    app_module.passwords = PasswordHasher(workers=workers, queue=signups, **options)
+
+    def signup(i):
+        body = {"email": f"setting{index}-{i}@example.com", "password": "password",
+                "username": f"setting{index}-{i}", "is_active": True}
+        start = time.perf_counter()
+        response = app.test_client().post("/users", json=body)
+        return time.perf_counter() - start, response.status_code
+
+    def login(i):
+        start = time.perf_counter()
+        response = app.test_client().post("/login", json={"username": f"setting{index}-{i}", "password": "password"})
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        signed_up = list(pool.map(signup, range(signups)))
+    wall = time.perf_counter() - start
+    logged_in = [login(i) for i in range(min(signups, 20))]
+
+    latencies = sorted(seconds * 1000 for seconds, status in signed_up)
+    return {
+        "setting": name,
+        "signups_per_second": round(signups / wall, 1),
+        "signup_p50_ms": round(statistics.median(latencies), 1),
+        "signup_max_ms": round(latencies[-1], 1),
+        "login_p50_ms": round(statistics.median(seconds * 1000 for seconds, status in logged_in), 1),
+        "errors": sum(1 for seconds, status in signed_up + logged_in if status != 200),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--signups", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="hashing threads")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+    from app import app
+    from models import db
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    results = [run_setting(app, index, name, options, args.signups, args.concurrency, args.workers)
+               for index, (name, options) in enumerate(SETTINGS)]
+    print(json.dumps({"cpus": os.cpu_count(), "hash_workers": args.workers,
+                      "concurrency": args.concurrency, "results": results}, indent=2))
@@ -0,0 +1,76 @@
+"""
+Bytes on the wire and CPU per request of the list endpoints with and without
+compression, on an in-memory SQLite seeded by seed.py.
+For the cached catalog lists it compares a cache miss (serialize + compress) with a
+cache hit, which sends the bytes compressed when the entry was filled.
+
+    $ python bench/response_compression.py --characters 1000 --planets 200 --requests 200
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ.setdefault("ADMIN_ENABLED", "false")
+
+from seed import seed, add_volume_arguments
+from app import app, compressor
+from models import db
+from versions import bump_versions
+
+ENDPOINTS = [("/characters", "characters"), ("/planets", "planets"), ("/users", None)]
+
+def bump(name):
+    with app.app_context():
+        bump_versions(name)
+        db.session.commit()
+
+def measure(client, path, accept_encoding, requests, before=None):
+    headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+    size = 0
+    cpu = 0.0
+    for _ in range(requests):
+        if before is not None:
+            before()
+        start = time.process_time()
+        response = client.get(path, headers=headers)
+        cpu += time.process_time() - start
+        size = len(response.get_data())
+    return {"bytes": size, "cpu_ms": round(cpu / requests * 1000, 3)}
+
+def run(volumes, requests):
+    client = app.test_client()
+    encodings = list(compressor.encoders)
+    results = {"volumes": volumes, "requests": requests, "encodings": encodings, "endpoints": {}}
+    for path, namespace in ENDPOINTS:
+        path = f"{path}?limit=1000"
+        endpoint = results["endpoints"][path] = {}
+        # a new version before every request makes each one a cache miss
+        miss = (lambda: bump(namespace)) if namespace else None
+
+        compressor.enabled = False
+        endpoint["identity"] = measure(client, path, None, requests, miss)
+        compressor.enabled = True
+        for encoding in encodings:
+            endpoint[encoding] = measure(client, path, encoding, requests, miss)
+            if namespace:
+                client.get(path, headers={"Accept-Encoding": encoding})
+                endpoint[f"{encoding}_cached"] = measure(client, path, encoding, requests)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_volume_arguments(parser)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    with app.app_context():
+        volumes = seed(args.users, args.characters, args.planets, args.favorites_per_user)
+    print(json.dumps(run(volumes, args.requests), indent=2))
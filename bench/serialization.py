@@ -0,0 +1,55 @@
+"""
+Compares the old list path, Model.query.all() + serialize() + jsonify, with the
+serializer.py path, selected tuples + rows_to_dicts + dumps, on an in-memory SQLite.
+
+    $ python bench/serialization.py --rows 20000
+"""
+import os
+import sys
+import json
+import argparse
+import timeit
+
+os.environ["DATABASE_URL"] = "sqlite://"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from flask import jsonify
+from app import app
+from models import db, Character
+from serializer import rows_to_dicts, json_response
+
+def seed(rows):
+    db.create_all()
+    db.session.execute(db.insert(Character), [
+        {"name": f"Character {i}", "specie": "human", "height": str(150 + i % 60), "gender": "female"}
+        for i in range(rows)])
+    db.session.commit()
+
+def orm_serialize_jsonify():
+    characters = Character.query.all()
+    response = jsonify(list(map(lambda character: character.serialize(), characters)))
+    db.session.expunge_all()
+    return response.get_data()
+
+def tuples_fast_encoder():
+    fields = list(Character.public_fields)
+    rows = db.session.execute(db.select(*[getattr(Character, field) for field in fields])).all()
+    return json_response(rows_to_dicts(fields, rows)).get_data()
+
+def run(rows, repeat):
+    with app.test_request_context():
+        seed(rows)
+        assert json.loads(orm_serialize_jsonify()) == json.loads(tuples_fast_encoder())
+        results = {"rows": rows, "repeat": repeat}
+        for name, function in [("serialize_jsonify", orm_serialize_jsonify), ("fast_serializer", tuples_fast_encoder)]:
+            best = min(timeit.repeat(function, number=1, repeat=repeat))
+            results[name] = {"best_ms": round(best * 1000, 2)}
+        results["speedup"] = round(results["serialize_jsonify"]["best_ms"] / results["fast_serializer"]["best_ms"], 2)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
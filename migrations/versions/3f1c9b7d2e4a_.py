@@ -0,0 +1,151 @@
+"""full schema with favorites indexes
+
+Revision ID: 3f1c9b7d2e4a
+Revises: a5cffa318ac2
+Create Date: 2026-10-17 10:12:44.318202
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9b7d2e4a'
+down_revision = 'a5cffa318ac2'
+branch_labels = None
+depends_on = None
+
+
+def existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+def existing_indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+def create_missing_indexes(table, indexes):
+    # databases built from models.py before this revision already have the tables,
+    # there we only add the indexes that are missing
+    present = existing_indexes(table)
+    for name, columns, unique in indexes:
+        if name not in present:
+            op.create_index(name, table, columns, unique=unique)
+
+# foreign keys built by models.py have no name on SQLite, batch mode needs one to drop them
+FAVORITE_NAMING = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+def cascade_existing_favorites(table, entity_column, entity_table):
+    # favorite tables built from models.py have nullable foreign keys without ON DELETE,
+    # they are rebuilt with the NOT NULL columns and ON DELETE CASCADE of create_table below
+    foreign_keys = sa.inspect(op.get_bind()).get_foreign_keys(table)
+    columns = sa.inspect(op.get_bind()).get_columns(table)
+    if (all((fk.get('options') or {}).get('ondelete', '').upper() == 'CASCADE' for fk in foreign_keys)
+            and not any(column['nullable'] for column in columns if column['name'] in (entity_column, 'user_id'))):
+        return
+
+    # rows without a user or an entity (or pointing to one that is gone) could never be read back
+    favorite = sa.table(table, sa.column('id'), sa.column('user_id'), sa.column(entity_column))
+    user = sa.table('user', sa.column('id'))
+    entity = sa.table(entity_table, sa.column('id'))
+    op.execute(favorite.delete().where(sa.or_(
+        favorite.c.user_id.is_(None), favorite.c.user_id.not_in(sa.select(user.c.id)),
+        favorite.c[entity_column].is_(None), favorite.c[entity_column].not_in(sa.select(entity.c.id)))))
+    # and the unique index added below needs the duplicates gone, the oldest one stays
+    op.execute(favorite.delete().where(favorite.c.id.not_in(
+        sa.select(sa.func.min(favorite.c.id)).group_by(favorite.c.user_id, favorite.c[entity_column]))))
+
+    with op.batch_alter_table(table, schema=None, naming_convention=FAVORITE_NAMING) as batch_op:
+        for fk in foreign_keys:
+            name = fk['name'] or f"fk_{table}_{fk['constrained_columns'][0]}_{fk['referred_table']}"
+            batch_op.drop_constraint(name, type_='foreignkey')
+        batch_op.alter_column(entity_column, existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key(f'fk_{table}_{entity_column}_{entity_table}', entity_table,
+                                    [entity_column], ['id'], ondelete='CASCADE')
+        batch_op.create_foreign_key(f'fk_{table}_user_id_user', 'user', ['user_id'], ['id'], ondelete='CASCADE')
+
+
+def upgrade():
+    tables = existing_tables()
+
+    user_columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('user')}
+    if 'username' not in user_columns:
+        with op.batch_alter_table('user', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('username', sa.String(length=120), nullable=True))
+            batch_op.add_column(sa.Column('first_name', sa.String(length=120), nullable=True))
+            batch_op.add_column(sa.Column('last_name', sa.String(length=120), nullable=True))
+
+        # existing users get their email as username so the column can be NOT NULL
+        user = sa.table('user', sa.column('username'), sa.column('email'))
+        op.execute(user.update().where(user.c.username.is_(None)).values(username=user.c.email))
+
+        with op.batch_alter_table('user', schema=None) as batch_op:
+            batch_op.alter_column('username', existing_type=sa.String(length=120), nullable=False)
+            batch_op.create_unique_constraint('uq_user_username', ['username'])
+
+    if 'character' not in tables:
+        op.create_table('character',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('specie', sa.String(length=50), nullable=False),
+        sa.Column('height', sa.String(length=20), nullable=False),
+        sa.Column('gender', sa.String(length=20), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+        )
+    create_missing_indexes('character', [('ix_character_specie', ['specie'], False)])
+
+    if 'planet' not in tables:
+        op.create_table('planet',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('population', sa.String(length=50), nullable=False),
+        sa.Column('terrain', sa.String(length=100), nullable=False),
+        sa.Column('diameter', sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+        )
+    create_missing_indexes('planet', [('ix_planet_terrain', ['terrain'], False)])
+
+    if 'character_fav' not in tables:
+        op.create_table('character_fav',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('character_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['character_id'], ['character.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+    else:
+        cascade_existing_favorites('character_fav', 'character_id', 'character')
+    create_missing_indexes('character_fav', [
+        ('ix_character_fav_user_id_character_id', ['user_id', 'character_id'], True),
+        ('ix_character_fav_character_id', ['character_id'], False),
+    ])
+
+    if 'planet_fav' not in tables:
+        op.create_table('planet_fav',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('planet_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['planet_id'], ['planet.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+    else:
+        cascade_existing_favorites('planet_fav', 'planet_id', 'planet')
+    create_missing_indexes('planet_fav', [
+        ('ix_planet_fav_user_id_planet_id', ['user_id', 'planet_id'], True),
+        ('ix_planet_fav_planet_id', ['planet_id'], False),
+    ])
+
+
+def downgrade():
+    op.drop_table('planet_fav')
+    op.drop_table('character_fav')
+    op.drop_table('planet')
+    op.drop_table('character')
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_user_username', type_='unique')
+        batch_op.drop_column('last_name')
+        batch_op.drop_column('first_name')
+        batch_op.drop_column('username')
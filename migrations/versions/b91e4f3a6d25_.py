@@ -0,0 +1,53 @@
+"""search index over character and planet names
+
+Revision ID: b91e4f3a6d25
+Revises: 7c2d8e91ab40
+Create Date: 2026-10-17 12:20:51.730946
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b91e4f3a6d25'
+down_revision = '7c2d8e91ab40'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_TRIGGERS = {
+    'character': '0',
+    'planet': '1',
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX IF NOT EXISTS ix_character_name_trgm ON character USING gin (name gin_trgm_ops)')
+        op.execute('CREATE INDEX IF NOT EXISTS ix_planet_name_trgm ON planet USING gin (name gin_trgm_ops)')
+    elif dialect == 'sqlite':
+        # rowid = entity id * 2 + 0 for characters and + 1 for planets
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(name, prefix='2 3')")
+        for table, parity in SQLITE_TRIGGERS.items():
+            op.execute(f'CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} BEGIN '
+                       f'INSERT INTO search_index(rowid, name) VALUES (new.id * 2 + {parity}, new.name); END')
+            op.execute(f'CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} BEGIN '
+                       f'DELETE FROM search_index WHERE rowid = old.id * 2 + {parity}; END')
+            op.execute(f'CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF name ON {table} BEGIN '
+                       f'UPDATE search_index SET name = new.name WHERE rowid = old.id * 2 + {parity}; END')
+            op.execute(f'INSERT INTO search_index(rowid, name) SELECT id * 2 + {parity}, name FROM {table}')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_planet_name_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_character_name_trgm')
+    elif dialect == 'sqlite':
+        for table in SQLITE_TRIGGERS:
+            for action in ('insert', 'delete', 'update'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_search_{action}')
+        op.execute('DROP TABLE IF EXISTS search_index')
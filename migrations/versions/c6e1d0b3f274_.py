@@ -0,0 +1,81 @@
+"""one favorite table for every entity
+
+Revision ID: c6e1d0b3f274
+Revises: f8c3a6d19b57
+Create Date: 2026-10-17 17:02:15.604318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e1d0b3f274'
+down_revision = 'f8c3a6d19b57'
+branch_labels = None
+depends_on = None
+
+# entity_type -> (old table, its column of the entity id)
+OLD_TABLES = {
+    'character': ('character_fav', 'character_id'),
+    'planet': ('planet_fav', 'planet_id'),
+}
+
+
+def favorite_table():
+    return sa.table('favorite', sa.column('id'), sa.column('user_id'), sa.column('entity_type'), sa.column('entity_id'))
+
+
+def create_old_table(table_name, entity_column, entity_table):
+    op.create_table(table_name,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column(entity_column, sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint([entity_column], [f'{entity_table}.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(f'ix_{table_name}_user_id_{entity_column}', table_name, ['user_id', entity_column], unique=True)
+    op.create_index(f'ix_{table_name}_{entity_column}', table_name, [entity_column], unique=False)
+
+
+def upgrade():
+    op.create_table('favorite',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('entity_type', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_favorite_user_id_entity_type_entity_id', 'favorite', ['user_id', 'entity_type', 'entity_id'],
+                    unique=True, postgresql_include=['id'])
+    op.create_index('ix_favorite_entity_type_entity_id', 'favorite', ['entity_type', 'entity_id'], unique=False)
+
+    # one INSERT ... SELECT per old table, the favorites get new ids (characters first, in their old order)
+    favorite = favorite_table()
+    for entity_type, (table_name, entity_column) in OLD_TABLES.items():
+        old = sa.table(table_name, sa.column('id'), sa.column('user_id'), sa.column(entity_column))
+        op.execute(favorite.insert().from_select(['user_id', 'entity_type', 'entity_id'], sa.select(
+            old.c.user_id, sa.literal(entity_type), old.c[entity_column]).order_by(old.c.id)))
+
+    op.drop_table('planet_fav')
+    op.drop_table('character_fav')
+
+
+def downgrade():
+    favorite = favorite_table()
+    for entity_type, (table_name, entity_column) in OLD_TABLES.items():
+        create_old_table(table_name, entity_column, entity_type)
+        old = sa.table(table_name, sa.column('id'), sa.column('user_id'), sa.column(entity_column))
+        entity = sa.table(entity_type, sa.column('id'))
+        # the ids are kept, favorites of entities that are gone would break the foreign key
+        op.execute(old.insert().from_select(['id', 'user_id', entity_column], sa.select(
+            favorite.c.id, favorite.c.user_id, favorite.c.entity_id).where(
+            favorite.c.entity_type == entity_type, favorite.c.entity_id.in_(sa.select(entity.c.id)))))
+        if op.get_bind().dialect.name == 'postgresql':
+            op.execute(f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), COALESCE(MAX(id), 1)) FROM {table_name}")
+
+    op.drop_index('ix_favorite_entity_type_entity_id', table_name='favorite')
+    op.drop_index('ix_favorite_user_id_entity_type_entity_id', table_name='favorite')
+    op.drop_table('favorite')
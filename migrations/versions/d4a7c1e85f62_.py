@@ -0,0 +1,73 @@
+"""numeric shadow columns for height, population and diameter
+
+Revision ID: d4a7c1e85f62
+Revises: b91e4f3a6d25
+Create Date: 2026-10-17 13:05:37.112480
+
+"""
+import math
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7c1e85f62'
+down_revision = 'b91e4f3a6d25'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def parse_number(value):
+    # same rules as models.parse_number at the time of this revision
+    if value is None:
+        return None
+    try:
+        number = float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def backfill(table_name, columns):
+    """Fills `<column>_number` from `<column>` for every row of the table"""
+    connection = op.get_bind()
+    table = sa.table(table_name, sa.column('id'), *[sa.column(column) for column in columns],
+                     *[sa.column(f'{column}_number') for column in columns])
+    rows = connection.execute(sa.select(table.c.id, *[table.c[column] for column in columns])).all()
+    update = table.update().where(table.c.id == sa.bindparam('row_id')).values(
+        **{f'{column}_number': sa.bindparam(f'{column}_value') for column in columns})
+    for start in range(0, len(rows), BACKFILL_BATCH_SIZE):
+        batch = rows[start:start + BACKFILL_BATCH_SIZE]
+        connection.execute(update, [
+            {'row_id': row[0], **{f'{column}_value': parse_number(value) for column, value in zip(columns, row[1:])}}
+            for row in batch])
+
+
+def upgrade():
+    with op.batch_alter_table('character', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('height_number', sa.Float(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_character_height_number'), ['height_number'], unique=False)
+
+    with op.batch_alter_table('planet', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('population_number', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('diameter_number', sa.Float(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_planet_diameter_number'), ['diameter_number'], unique=False)
+        batch_op.create_index(batch_op.f('ix_planet_population_number'), ['population_number'], unique=False)
+
+    backfill('character', ['height'])
+    backfill('planet', ['population', 'diameter'])
+
+
+def downgrade():
+    # a recreated table would lose the search triggers, SQLite >= 3.35 drops columns in place
+    with op.batch_alter_table('planet', schema=None, recreate='never') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_planet_population_number'))
+        batch_op.drop_index(batch_op.f('ix_planet_diameter_number'))
+        batch_op.drop_column('diameter_number')
+        batch_op.drop_column('population_number')
+
+    with op.batch_alter_table('character', schema=None, recreate='never') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_character_height_number'))
+        batch_op.drop_column('height_number')
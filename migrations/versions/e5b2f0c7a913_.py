@@ -0,0 +1,33 @@
+"""wider user.password for the KDF hashes
+
+Revision ID: e5b2f0c7a913
+Revises: d4a7c1e85f62
+Create Date: 2026-10-17 15:42:10.503119
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b2f0c7a913'
+down_revision = 'd4a7c1e85f62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the plain text passwords already stored are hashed on the next login
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password',
+               existing_type=sa.String(length=80),
+               type_=sa.String(length=255),
+               existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password',
+               existing_type=sa.String(length=255),
+               type_=sa.String(length=80),
+               existing_nullable=False)
@@ -0,0 +1,58 @@
+"""favorite counters on user, character and planet
+
+Revision ID: f8c3a6d19b57
+Revises: e5b2f0c7a913
+Create Date: 2026-10-17 16:20:48.271904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8c3a6d19b57'
+down_revision = 'e5b2f0c7a913'
+branch_labels = None
+depends_on = None
+
+
+def backfill(table_name, column, fav_table_name, fav_column):
+    """One correlated UPDATE: `column` = how many `fav_table_name` rows point to the row"""
+    table = sa.table(table_name, sa.column('id'), sa.column(column))
+    favorites = sa.table(fav_table_name, sa.column(fav_column))
+    op.execute(table.update().values({column: sa.select(sa.func.count()).where(
+        favorites.c[fav_column] == table.c.id).scalar_subquery()}))
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('favorite_characters_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('favorite_planets_count', sa.Integer(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('character', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('favorites_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_character_favorites_count'), ['favorites_count'], unique=False)
+
+    with op.batch_alter_table('planet', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('favorites_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_planet_favorites_count'), ['favorites_count'], unique=False)
+
+    backfill('user', 'favorite_characters_count', 'character_fav', 'user_id')
+    backfill('user', 'favorite_planets_count', 'planet_fav', 'user_id')
+    backfill('character', 'favorites_count', 'character_fav', 'character_id')
+    backfill('planet', 'favorites_count', 'planet_fav', 'planet_id')
+
+
+def downgrade():
+    # a recreated table would lose the search triggers, SQLite >= 3.35 drops columns in place
+    with op.batch_alter_table('planet', schema=None, recreate='never') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_planet_favorites_count'))
+        batch_op.drop_column('favorites_count')
+
+    with op.batch_alter_table('character', schema=None, recreate='never') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_character_favorites_count'))
+        batch_op.drop_column('favorites_count')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('favorite_planets_count')
+        batch_op.drop_column('favorite_characters_count')
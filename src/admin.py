@@ -1,20 +1,29 @@
 import os
 from flask_admin import Admin
-from models import db, User, Character, Planet, Character_fav, Planet_fav
+from models import db, User, Character, Planet, Favorite
 from flask_admin.contrib.sqla import ModelView
 
-def setup_admin(app):
+class UserView(ModelView):
+    def __init__(self, passwords, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.passwords = passwords
+
+    def on_model_change(self, form, model, is_created):
+        # the form shows the stored hash, a new value typed in is hashed before it is saved
+        if not self.passwords.is_hash(model.password):
+            model.password = self.passwords.hash(model.password)
+
+def setup_admin(app, passwords):
     app.secret_key = os.environ.get('FLASK_APP_KEY', 'sample key')
     app.config['FLASK_ADMIN_SWATCH'] = 'cerulean'
     admin = Admin(app, name='4Geeks Admin', template_mode='bootstrap3')
 
     
     # Add your models here, for example this is how we add a the User model to the admin
-    admin.add_view(ModelView(User, db.session))
+    admin.add_view(UserView(passwords, User, db.session))
     admin.add_view(ModelView(Character, db.session))
     admin.add_view(ModelView(Planet, db.session))
-    admin.add_view(ModelView(Character_fav, db.session))
-    admin.add_view(ModelView(Planet_fav, db.session))
+    admin.add_view(ModelView(Favorite, db.session))
 
     # You can duplicate that line to add mew models
     # admin.add_view(ModelView(YourModelName, db.session))
\ No newline at end of file
@@ -2,47 +2,86 @@
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 import os
-from flask import Flask, request, jsonify, url_for
+from flask import Flask, Response, request, jsonify, url_for
 from flask_migrate import Migrate
-from flask_swagger import swagger
 from flask_cors import CORS
-from utils import APIException, generate_sitemap
-from admin import setup_admin
-from models import db, User, Character, Planet, Character_fav, Planet_fav
+from sqlalchemy import func, and_
+from sqlalchemy.exc import SQLAlchemyError
+from utils import APIException, generate_sitemap, paginate, stream_ndjson, wants_ndjson, parse_int_arg, set_next_link
+from database import setup_database, env_setting
+from cache import setup_cache
+from ratelimit import setup_rate_limit
+from metrics import setup_metrics
+from compression import setup_compression
+from passwords import setup_passwords
+from counters import setup_counters
+from versions import conditional, bump_versions
+from serializer import json_response, rows_to_dicts
+from search import search, ENTITY_MODELS
+from bulk import get_batch, bulk_create_catalog, bulk_create_favorites, bulk_delete, delete_returning, delete_favorites
+from validation import missing_property, as_id, writable_properties, find_taken, find_favorite, insert
+from models import db, User, Character, Planet, Favorite, FAVORITE_ENTITIES
 #from models import Person
 
 app = Flask(__name__)
 app.url_map.strict_slashes = False
 
-db_url = os.getenv("DATABASE_URL")
-if db_url is not None:
-    app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace("postgres://", "postgresql://")
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+setup_database(app)
 
 MIGRATE = Migrate(app, db)
 db.init_app(app)
 CORS(app)
-setup_admin(app)
+passwords = setup_passwords(app)
+app.config.setdefault('ADMIN_ENABLED', env_setting('ADMIN_ENABLED', True))
+if app.config['ADMIN_ENABLED']:
+    # flask_admin is the heaviest import of the app, workers started with ADMIN_ENABLED=false skip it
+    from admin import setup_admin
+    setup_admin(app, passwords)
+metrics = setup_metrics(app)
+# registered after the metrics, after_request hooks run in reverse so the size and time recorded include compression
+compressor = setup_compression(app)
+cache = setup_cache(app, compressor)
+limiter = setup_rate_limit(app)
+setup_counters(app)
 
 # Handle/serialize errors like a JSON object
 @app.errorhandler(APIException)
 def handle_invalid_usage(error):
     return jsonify(error.to_dict()), error.status_code
 
-# generate sitemap with all your endpoints
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(cache.stats()), 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4"), 200
+
+# liveness: the process answers, nothing else is checked
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok"}), 200
+
+# readiness: one round trip to the database on a pooled connection, no ORM session involved
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    try:
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+    except SQLAlchemyError as error:
+        return jsonify({"status": "unavailable", "Error": type(error).__name__}), 503
+    return jsonify({"status": "ok"}), 200
+
+# generate sitemap with all your endpoints, it is built once at the bottom of this file
 @app.route('/')
 def sitemap():
-    return generate_sitemap(app)
+    return SITEMAP
 
 # USER FUNCTIONS
 @app.route('/users', methods=['GET'])
 def get_users():
-    all_users = User.query.all()
-    all_users_list = list(map(lambda user: user.serialize(),all_users))
-
-    return jsonify(all_users_list), 200
+    if wants_ndjson(): return stream_ndjson(User), 200
+    return paginate(User), 200
 
 @app.route('/users/<username>', methods=['GET'])
 def get_user(username):
@@ -54,77 +93,125 @@ def add_user():
     user_data = request.json
     required_properties = ["email", "password", "username", "is_active"]
 
-    for prop in required_properties:
-        if prop not in user_data: return jsonify({"Error": f"The '{prop}' property of the user is not or is not properly written"}), 400    
-        existing_email = User.query.filter_by(email=user_data["email"]).first()
-        if existing_email: return jsonify({"Error": f"The email '{existing_email.email}' is already registered in the database"}), 400
-        existing_username = User.query.filter_by(username=user_data["username"]).first()
-        if existing_username: return jsonify({"Error": f"The username '{existing_username.username}' is already registered in the database"}), 400      
+    error = missing_property(user_data, required_properties, " of the user")
+    if error: return jsonify({"Error": error}), 400
 
-    for prop in required_properties:
-        for key in user_data:
-            if prop == key and user_data[key] == "": return jsonify({"Error": f"The value of '{key}' must not be empty"}), 400
+    def check():
+        taken = find_taken(User, user_data, ["email", "username"])
+        if taken: return f"The {taken} '{user_data[taken]}' is already registered in the database"
 
-    user_to_add = User(**user_data)
-    db.session.add(user_to_add)
-    db.session.commit()
+    def new_user():
+        return User(**{**writable_properties(User, user_data, required_properties),
+                       "password": passwords.hash(user_data["password"])})
+
+    user_to_add, error = insert(new_user, check)
+    if error: return jsonify({"Error": error}), 400
 
     return jsonify(user_to_add.serialize()), 200
 
+@app.route('/login', methods=['POST'])
+def login():
+    login_data = request.json
+    error = missing_property(login_data, ["username", "password"])
+    if error: return jsonify({"Error": error}), 400
+
+    user = User.query.filter_by(username=login_data["username"]).first()
+    # an unknown username costs the same hash, so the response time does not tell it apart
+    if not passwords.verify(login_data["password"], user.password if user else passwords.dummy_hash) or not user:
+        return jsonify({"Error": "The username or the password is not correct"}), 401
+
+    # hashes made with older cost settings (or plain text ones) are replaced while we know the password
+    if passwords.needs_rehash(user.password):
+        user.password = passwords.hash(login_data["password"])
+        db.session.commit()
+
+    return jsonify(user.serialize()), 200
+
 @app.route('/users/<int:user_id>', methods=['DELETE'])
 def del_user(user_id):
-    user = User.query.filter_by(id=user_id).first()
+    bump_versions(f"favorites:{user_id}")
+    # a single DELETE ... RETURNING, the favorites of the user go with the ON DELETE CASCADE
+    user = delete_returning(User, user_id, "first_name")
     if not user: return jsonify({"Error": "This user's ID does not exist in the database"}), 400
-    user_to_delete = user.serialize()
-    user_name = user_to_delete["first_name"]
-    db.session.delete(user)
-    db.session.commit()
 
-    return jsonify({"Deleted": f"The user '{user_name}' was eradicated successfully"}), 200
+    return jsonify({"Deleted": f"The user '{user.first_name}' was eradicated successfully"}), 200
 
 # FAVORITES
 @app.route('/users/<int:user_id>/favorites', methods=['GET'])
+@conditional("favorites:{user_id}", "characters", "planets")
 def get_favorites(user_id):
-    fav_characters = Character_fav.query.filter_by(user_id=user_id).all()
-    fav_planets = Planet_fav.query.filter_by(user_id=user_id).all()
-    favorites = fav_characters + fav_planets
-    serialized_favorites = list(map(lambda fav: fav.serialize(), favorites))
-
-    return jsonify(serialized_favorites), 200
+    # one range scan of the (user_id, entity_type, entity_id) index in its own order, the names come
+    # from a join per entity table in the same SELECT, no ORM objects and no serialize() per favorite
+    name = func.coalesce(*[model.name for model in FAVORITE_ENTITIES.values()])
+    query = db.select(Favorite.id, Favorite.entity_type, Favorite.entity_id, name)
+    for entity_type, model in FAVORITE_ENTITIES.items():
+        query = query.outerjoin(model, and_(Favorite.entity_type == entity_type, model.id == Favorite.entity_id))
+    favorites = db.session.execute(
+        query.where(Favorite.user_id == user_id, name.isnot(None)).order_by(Favorite.entity_type, Favorite.entity_id)).all()
+    serialized_favorites = [{"id": favorite_id, f"{entity_type}_id": entity_id, f"{entity_type}_name": entity_name}
+                            for favorite_id, entity_type, entity_id, entity_name in favorites]
+
+    return json_response(serialized_favorites), 200
+
+# ?type=characters or ?type=planets, both of them by default
+FAVORITE_TYPES = {"characters": "character", "planets": "planet"}
+
+@app.route('/users/<int:user_id>/favorites', methods=['DELETE'])
+def del_favorites(user_id):
+    favorite_type = request.args.get("type")
+    if favorite_type is not None and favorite_type not in FAVORITE_TYPES:
+        return jsonify({"Error": f"The 'type' must be one of {', '.join(FAVORITE_TYPES)}"}), 400
+    favorite_types = [favorite_type] if favorite_type else list(FAVORITE_TYPES)
+
+    deleted = {}
+    for name in favorite_types:
+        # every delete_favorites commits, each commit bumps the counter
+        bump_versions(f"favorites:{user_id}")
+        deleted[name] = delete_favorites(FAVORITE_TYPES[name], Favorite.user_id == user_id)
+
+    return jsonify({"Deleted": deleted}), 200
+
+@app.route('/users/<int:user_id>/favorites/summary', methods=['GET'])
+@conditional("favorites:{user_id}", "characters", "planets")
+def get_favorites_summary(user_id):
+    # read from the counters of the user, no favorites are scanned
+    counts = db.session.execute(
+        db.select(User.favorite_characters_count, User.favorite_planets_count).where(User.id == user_id)).first()
+    if not counts: return jsonify({"Error": "This user's ID does not exist in the database"}), 400
+    characters, planets = counts
+
+    return jsonify({"user_id": user_id, "characters": characters, "planets": planets, "total": characters + planets}), 200
 
 @app.route('/users/<int:user_id>/favorites/characters', methods=['POST'])
 def add_favorites_characters(user_id):
     id_data = request.json
-    character_id = id_data["character_id"]
     required_properties = ["user_id", "character_id"]
 
-    for prop in required_properties:
-        if prop not in id_data: return jsonify({"Error": f"The '{prop}' property was not properly written"}), 400
-
-    for key in id_data:
-        if id_data[key] == "": return jsonify({"Error": f"The value of '{key}' must not be empty"}), 400
+    error = missing_property(id_data, required_properties)
+    if error: return jsonify({"Error": error}), 400
+    character_id = as_id(id_data["character_id"])
+    if character_id is None: return jsonify({"Error": "The value of 'character_id' must be an integer id"}), 400
 
-    existing_favorite = Character_fav.query.filter_by(character_id=character_id, user_id=user_id).first()
-    if existing_favorite: 
-        serialized_existing_favorite = existing_favorite.serialize()
-        existing_favorite_name = serialized_existing_favorite["character_name"]
-        return jsonify({"Error": f"The ID {character_id} is already in the favorites list and belongs to the powerful {existing_favorite_name}"}), 400
+    def check():
+        favorite = find_favorite("character", user_id, character_id)
+        if favorite is None: return "This user's ID does not exist in the database"
+        character_name, already_favorite = favorite
+        if character_name is None: return f"The ID {character_id} does not belong to any character"
+        if already_favorite: return f"The ID {character_id} is already in the favorites list and belongs to the powerful {character_name}"
 
-    searching_character = Character.query.filter_by(id=character_id).first()
-    if not searching_character: return jsonify({"Error": f"The ID {character_id} does not belong to any character"}), 400
-
-    new_character_fav = Character_fav(character_id=character_id, user_id=user_id)
-    db.session.add(new_character_fav)
-    db.session.commit()
+    bump_versions(f"favorites:{user_id}")
+    new_character_fav, error = insert(Favorite(user_id=user_id, entity_type="character", entity_id=character_id), check)
+    if error: return jsonify({"Error": error}), 400
 
     return jsonify(new_character_fav.serialize()), 200
 
 @app.route('/users/<int:user_id>/favorites/characters/<int:general_id>', methods=['DELETE'])
 def del_favorite_character(user_id, general_id):
-    character = Character_fav.query.filter_by(id=general_id).first()
+    character = Favorite.query.filter_by(id=general_id, user_id=user_id, entity_type="character").first()
     if not character: return jsonify({"Error": f"The ID introduced does not exist in the favorite list"}), 400
     character_to_delete = character.serialize()
     character_name = character_to_delete["character_name"]
+    bump_versions(f"favorites:{user_id}")
     db.session.delete(character)
     db.session.commit()
 
@@ -133,50 +220,102 @@ def del_favorite_character(user_id, general_id):
 @app.route('/users/<int:user_id>/favorites/planets', methods=['POST'])
 def add_favorites_planets(user_id):
     id_data = request.json
-    planet_id = id_data["planet_id"]
     required_properties = ["user_id", "planet_id"]
 
-    for prop in required_properties:
-        if prop not in id_data: return jsonify({"Error": f"The '{prop}' property was not properly written"}), 400
-
-    for key in id_data:
-        if id_data[key] == "": return jsonify({"Error": f"The value of '{key}' must not be empty"}), 400
-
-    existing_favorite = Planet_fav.query.filter_by(planet_id=planet_id, user_id=user_id).first()
-    if existing_favorite: 
-        serialized_existing_favorite = existing_favorite.serialize()
-        existing_favorite_name = serialized_existing_favorite["planet_name"]
-        return jsonify({"Error": f"The ID {planet_id} is already in the favorites list and belongs to the amazing {existing_favorite_name}"}), 400
+    error = missing_property(id_data, required_properties)
+    if error: return jsonify({"Error": error}), 400
+    planet_id = as_id(id_data["planet_id"])
+    if planet_id is None: return jsonify({"Error": "The value of 'planet_id' must be an integer id"}), 400
 
-    searching_planet = Planet.query.filter_by(id=planet_id).first()
-    if not searching_planet: return jsonify({"Error": f"The ID {planet_id} does not belong to any planet"}), 400
+    def check():
+        favorite = find_favorite("planet", user_id, planet_id)
+        if favorite is None: return "This user's ID does not exist in the database"
+        planet_name, already_favorite = favorite
+        if planet_name is None: return f"The ID {planet_id} does not belong to any planet"
+        if already_favorite: return f"The ID {planet_id} is already in the favorites list and belongs to the amazing {planet_name}"
 
-    new_planet_fav = Planet_fav(planet_id=planet_id, user_id=user_id)
-    db.session.add(new_planet_fav)
-    db.session.commit()
+    bump_versions(f"favorites:{user_id}")
+    new_planet_fav, error = insert(Favorite(user_id=user_id, entity_type="planet", entity_id=planet_id), check)
+    if error: return jsonify({"Error": error}), 400
 
     return jsonify(new_planet_fav.serialize()), 200
 
 @app.route('/users/<int:user_id>/favorites/planets/<int:general_id>', methods=['DELETE'])
 def del_favorite_planets(user_id, general_id):
-    planet = Planet_fav.query.filter_by(id=general_id).first()
+    planet = Favorite.query.filter_by(id=general_id, user_id=user_id, entity_type="planet").first()
     if not planet: return jsonify({"Error": f"The ID introduced does not exist in the favorite list"}), 400
     planet_to_delete = planet.serialize()
     planet_name = planet_to_delete["planet_name"]
+    bump_versions(f"favorites:{user_id}")
     db.session.delete(planet)
     db.session.commit()
 
     return jsonify({"Deleted": f"The planet '{planet_name}' disappeared from the FAVORITE galaxy"}), 200
 
+@app.route('/users/<int:user_id>/favorites/characters/bulk', methods=['POST'])
+def add_favorites_characters_bulk(user_id):
+    items = get_batch(request.json)
+    bump_versions(f"favorites:{user_id}")
+    report = bulk_create_favorites("character", user_id, items)
+
+    return jsonify(report), 200
+
+@app.route('/users/<int:user_id>/favorites/characters/bulk', methods=['DELETE'])
+def del_favorites_characters_bulk(user_id):
+    ids = get_batch(request.json, "ids")
+    bump_versions(f"favorites:{user_id}")
+    report = bulk_delete(Favorite, ids, Favorite.user_id == user_id, Favorite.entity_type == "character")
+
+    return jsonify(report), 200
+
+@app.route('/users/<int:user_id>/favorites/planets/bulk', methods=['POST'])
+def add_favorites_planets_bulk(user_id):
+    items = get_batch(request.json)
+    bump_versions(f"favorites:{user_id}")
+    report = bulk_create_favorites("planet", user_id, items)
+
+    return jsonify(report), 200
+
+@app.route('/users/<int:user_id>/favorites/planets/bulk', methods=['DELETE'])
+def del_favorites_planets_bulk(user_id):
+    ids = get_batch(request.json, "ids")
+    bump_versions(f"favorites:{user_id}")
+    report = bulk_delete(Favorite, ids, Favorite.user_id == user_id, Favorite.entity_type == "planet")
+
+    return jsonify(report), 200
+
+def popular(model):
+    """The most favorited rows of `model`, ?limit= of them, walking the index on favorites_count"""
+    limit = parse_int_arg("limit", 10, minimum=1, maximum=100)
+    rows = db.session.execute(
+        db.select(model.id, model.name, model.favorites_count).where(model.favorites_count > 0)
+        .order_by(model.favorites_count.desc(), model.id).limit(limit)).all()
+    return json_response(rows_to_dicts(["id", "name", "favorites_count"], rows))
+
 # CHARACTER FUNCTIONS
+# query names of the numeric columns, ?min_height=&max_height=&sort=height
+CHARACTER_NUMBERS = {"height": "height_number"}
+
 @app.route('/characters', methods=['GET'])
+@limiter.limit()
+@conditional("characters")
+@cache.cached("characters")
 def get_characters():
-    all_characters = Character.query.all()
-    all_characters_list = list(map(lambda character: character.serialize(),all_characters))
+    if wants_ndjson(): return stream_ndjson(Character, filters=["specie"], numbers=CHARACTER_NUMBERS), 200
+    return paginate(Character, filters=["specie"], numbers=CHARACTER_NUMBERS), 200
 
-    return jsonify(all_characters_list), 200
+@app.route('/characters/export', methods=['GET'])
+def export_characters():
+    return stream_ndjson(Character, filters=["specie"], numbers=CHARACTER_NUMBERS), 200
+
+@app.route('/characters/popular', methods=['GET'])
+def get_popular_characters():
+    return popular(Character), 200
 
 @app.route('/characters/<int:character_id>', methods=['GET'])
+@limiter.limit()
+@conditional("characters:{character_id}")
+@cache.cached("characters", item_arg="character_id")
 def get_character(character_id):
     character = Character.query.filter_by(id=character_id).first()
     return jsonify(character.serialize()), 200
@@ -186,41 +325,65 @@ def add_character():
     character_data = request.json
     required_properties = ["name", "specie", "height", "gender"]
 
-    for prop in required_properties:
-        if prop not in character_data: return jsonify({"Error": f"The '{prop}' property of the character is not or is not properly written"}), 400
-
-    for key in character_data:
-        if character_data[key] == "": return jsonify({"Error": f"The value of '{key}' must not be empty"}), 400
+    error = missing_property(character_data, required_properties, " of the character")
+    if error: return jsonify({"Error": error}), 400
 
-    character_duplicate = Character.query.filter_by(name=character_data["name"]).first()
-    if character_duplicate: return jsonify({"Error": "This character's name already exists in the database"}), 400
+    def check():
+        if find_taken(Character, character_data, ["name"]): return "This character's name already exists in the database"
 
-    character_to_add = Character(**character_data)
-    db.session.add(character_to_add)
-    db.session.commit()
+    bump_versions("characters")
+    character_to_add, error = insert(Character(**writable_properties(Character, character_data, required_properties)), check)
+    if error: return jsonify({"Error": error}), 400
 
     return jsonify(character_to_add.serialize()), 200
 
 @app.route('/characters/<int:character_id>', methods=['DELETE'])
 def del_character(character_id):
-    character = Character.query.filter_by(id=character_id).first()
+    bump_versions("characters")
+    character = delete_returning(Character, character_id, "name", counter="characters")
     if not character: return jsonify({"Error": "This character's ID does not exist in the database"}), 400
-    character_to_delete = character.serialize()
-    character_name = character_to_delete["name"]
-    db.session.delete(character)
-    db.session.commit()
 
-    return jsonify({"Deleted": f"The character '{character_name}' disappeared from the galaxy"}), 200
+    return jsonify({"Deleted": f"The character '{character.name}' disappeared from the galaxy"}), 200
+
+@app.route('/characters/bulk', methods=['POST'])
+def add_characters_bulk():
+    items = get_batch(request.json)
+    bump_versions("characters")
+    report = bulk_create_catalog(Character, items, ["name", "specie", "height", "gender"])
+
+    return jsonify(report), 200
+
+@app.route('/characters/bulk', methods=['DELETE'])
+def del_characters_bulk():
+    ids = get_batch(request.json, "ids")
+    bump_versions("characters")
+    report = bulk_delete(Character, ids, counter="characters")
+
+    return jsonify(report), 200
 
 # PLANET FUNCTIONS
+PLANET_NUMBERS = {"population": "population_number", "diameter": "diameter_number"}
+
 @app.route('/planets', methods=['GET'])
+@limiter.limit()
+@conditional("planets")
+@cache.cached("planets")
 def get_planets():
-    all_planets = Planet.query.all()
-    all_planets_list = list(map(lambda planet: planet.serialize(),all_planets))
+    if wants_ndjson(): return stream_ndjson(Planet, filters=["terrain"], numbers=PLANET_NUMBERS), 200
+    return paginate(Planet, filters=["terrain"], numbers=PLANET_NUMBERS), 200
+
+@app.route('/planets/export', methods=['GET'])
+def export_planets():
+    return stream_ndjson(Planet, filters=["terrain"], numbers=PLANET_NUMBERS), 200
 
-    return jsonify(all_planets_list), 200
+@app.route('/planets/popular', methods=['GET'])
+def get_popular_planets():
+    return popular(Planet), 200
 
 @app.route('/planets/<int:planet_id>', methods=['GET'])
+@limiter.limit()
+@conditional("planets:{planet_id}")
+@cache.cached("planets", item_arg="planet_id")
 def get_planet(planet_id):
     planet = Planet.query.filter_by(id=planet_id).first()
 
@@ -231,31 +394,67 @@ def add_planets():
     planet_data = request.json
     required_properties = ["name", "diameter", "terrain", "population"]
 
-    for prop in required_properties:
-        if prop not in planet_data: return jsonify({"Error": f"The '{prop}' property of the planet is not properly written"}), 400
+    error = missing_property(planet_data, required_properties, " of the planet")
+    if error: return jsonify({"Error": error}), 400
 
-    for key in planet_data:
-        if planet_data[key] == "": return jsonify({"Error": f"The value of '{key}' must not be empty"}), 400
+    def check():
+        if find_taken(Planet, planet_data, ["name"]): return "This planet's name already exists in the database"
 
-    planet_duplicate = Planet.query.filter_by(name=planet_data["name"]).first()
-    if planet_duplicate: return jsonify({"Error": "This planet's name already exists in the database"}), 400
-
-    planet_to_add = Planet(**planet_data)
-    db.session.add(planet_to_add)
-    db.session.commit()
+    bump_versions("planets")
+    planet_to_add, error = insert(Planet(**writable_properties(Planet, planet_data, required_properties)), check)
+    if error: return jsonify({"Error": error}), 400
 
     return jsonify(planet_to_add.serialize()), 200
 
 @app.route('/planets/<int:planet_id>', methods=['DELETE'])
 def delete_planet(planet_id):
-    planet = Planet.query.filter_by(id=planet_id).first()
+    bump_versions("planets")
+    planet = delete_returning(Planet, planet_id, "name", counter="planets")
     if not planet: return jsonify({"Error": "This planet's ID does not exist in the database"}), 400
-    planet_to_delete = planet.serialize()
-    planet_name = planet_to_delete["name"]
-    db.session.delete(planet)
-    db.session.commit()
 
-    return jsonify({"Deleted": f"The planet '{planet_name}' was destroyed for the Empire successfully"}), 200
+    return jsonify({"Deleted": f"The planet '{planet.name}' was destroyed for the Empire successfully"}), 200
+
+@app.route('/planets/bulk', methods=['POST'])
+def add_planets_bulk():
+    items = get_batch(request.json)
+    bump_versions("planets")
+    report = bulk_create_catalog(Planet, items, ["name", "diameter", "terrain", "population"])
+
+    return jsonify(report), 200
+
+@app.route('/planets/bulk', methods=['DELETE'])
+def del_planets_bulk():
+    ids = get_batch(request.json, "ids")
+    bump_versions("planets")
+    report = bulk_delete(Planet, ids, counter="planets")
+
+    return jsonify(report), 200
+
+# SEARCH
+@app.route('/search', methods=['GET'])
+@limiter.limit()
+@conditional("characters", "planets")
+def search_catalog():
+    q = request.args.get("q", "").strip()
+    if q == "": return jsonify({"Error": "The value of 'q' must not be empty"}), 400
+    entity_type = request.args.get("type")
+    if entity_type is not None and entity_type not in ENTITY_MODELS:
+        return jsonify({"Error": f"The 'type' must be one of {', '.join(ENTITY_MODELS)}"}), 400
+    entity_types = [entity_type] if entity_type else list(ENTITY_MODELS)
+    limit = parse_int_arg("limit", 10, minimum=1, maximum=50)
+    offset = parse_int_arg("offset", 0)
+
+    # one extra row tells us if there is a next page
+    matches = search(q, entity_types, limit + 1, offset)
+    response = json_response(rows_to_dicts(["type", "id", "name"], matches[:limit]))
+    if len(matches) > limit:
+        set_next_link(response, offset=offset + limit, limit=limit)
+
+    return response, 200
+
+# every route is registered by now, so the sitemap can not change while the process runs
+with app.test_request_context():
+    SITEMAP = generate_sitemap(app)
 
 # this only runs if `$ python src/app.py` is executed
 if __name__ == '__main__':
@@ -0,0 +1,176 @@
+"""
+Batch versions of the create/delete endpoints.
+Every batch is validated with a few set based queries (IN (...)) and written
+in a single transaction, and the caller gets one report entry per item.
+"""
+from sqlalchemy import insert, delete, and_
+from utils import APIException
+from validation import missing_property, as_id, as_text, retry_on_conflict
+from counters import count_favorites, forget_favorites, forget_favorites_where
+from versions import bump_versions
+from models import db, User, Favorite, FAVORITE_ENTITIES, delete_favorites_of
+
+def get_batch(data, key=None):
+    if key is not None:
+        if not isinstance(data, dict) or key not in data:
+            raise APIException(f"The '{key}' property was not properly written")
+        data = data[key]
+    if not isinstance(data, list) or len(data) == 0:
+        raise APIException("The body must contain a non empty list")
+    return data
+
+def validate_items(items, required_properties, parse=as_text, expected="a string or a number"):
+    """
+    Checks the required properties of every item in memory, `parse` turns every value into
+    what goes to the database (None when it has the wrong type, `expected` says what it takes).
+    Returns the report (with the errors already filled in) and the
+    (index, row) pairs that are still candidates to be inserted.
+    """
+    report = [None] * len(items)
+    candidates = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            report[index] = {"index": index, "Error": "The item must be an object"}
+            continue
+        error = missing_property(item, required_properties)
+        if error:
+            report[index] = {"index": index, "Error": error}
+            continue
+        row = {prop: parse(item[prop]) for prop in required_properties}
+        wrong = next((prop for prop in required_properties if row[prop] is None), None)
+        if wrong:
+            report[index] = {"index": index, "Error": f"The value of '{wrong}' must be {expected}"}
+            continue
+        candidates.append((index, row))
+    return report, candidates
+
+def insert_rows(model, candidates, report, key, *criteria):
+    """
+    Inserts the candidate rows with one executemany and then reads the new ids
+    back with a single SELECT on `key`, which together with `criteria` must
+    identify a row of `model` (name for the catalog, target id for a user's favorites).
+    """
+    if candidates:
+        rows = [row for index, row in candidates]
+        db.session.execute(insert(model), rows)
+        key_column = getattr(model, key)
+        new_ids = dict(db.session.execute(
+            db.select(key_column, model.id).where(key_column.in_({row[key] for row in rows}), *criteria)).all())
+        for index, row in candidates:
+            report[index] = {"index": index, "id": new_ids[row[key]], **row}
+    db.session.commit()
+    return report
+
+def bulk_create_catalog(model, items, required_properties):
+    """Creates characters or planets, names must be unique in the batch and in the table"""
+    return retry_on_conflict(lambda: create_catalog(model, items, required_properties))
+
+def create_catalog(model, items, required_properties):
+    report, candidates = validate_items(items, required_properties)
+
+    names = {row["name"] for index, row in candidates}
+    taken = set(db.session.scalars(db.select(model.name).where(model.name.in_(names)))) if names else set()
+
+    to_insert = []
+    for index, row in candidates:
+        if row["name"] in taken:
+            report[index] = {"index": index, "Error": f"The name '{row['name']}' already exists in the database"}
+            continue
+        taken.add(row["name"])
+        to_insert.append((index, row))
+
+    return insert_rows(model, to_insert, report, "name")
+
+def bulk_create_favorites(entity_type, user_id, items):
+    """
+    Creates favorites of `user_id`, every item names its entity as "<entity_type>_id" (character_id),
+    the entities must exist and not be favorites already. A user that does not exist fails the whole batch.
+    """
+    return retry_on_conflict(lambda: create_favorites(entity_type, user_id, items))
+
+def create_favorites(entity_type, user_id, items):
+    entity_model = FAVORITE_ENTITIES[entity_type]
+    entity_key = f"{entity_type}_id"
+    report, candidates = validate_items(items, [entity_key], as_id, "an integer id")
+
+    entity_ids = {row[entity_key] for index, row in candidates}
+    existing_entities = set()
+    already_favorite = set()
+    if entity_ids:
+        existing_entities = set(db.session.scalars(db.select(entity_model.id).where(entity_model.id.in_(entity_ids))))
+        # one row per favorite the user already has among entity_ids (a NULL one when none), no row without the user
+        rows = db.session.execute(db.select(Favorite.entity_id).select_from(User).outerjoin(Favorite, and_(
+            Favorite.user_id == User.id, Favorite.entity_type == entity_type, Favorite.entity_id.in_(entity_ids)))
+            .where(User.id == user_id)).all()
+        if not rows:
+            raise APIException("This user's ID does not exist in the database")
+        already_favorite = {row.entity_id for row in rows if row.entity_id is not None}
+
+    to_insert = []
+    for index, row in candidates:
+        entity_id = row[entity_key]
+        if entity_id not in existing_entities:
+            report[index] = {"index": index, "Error": f"The ID {entity_id} does not exist in the database"}
+        elif entity_id in already_favorite:
+            report[index] = {"index": index, "Error": f"The ID {entity_id} is already in the favorites list"}
+        else:
+            already_favorite.add(entity_id)
+            to_insert.append((index, {"user_id": user_id, "entity_type": entity_type, "entity_id": entity_id}))
+
+    # same transaction as the INSERT, insert_rows commits both
+    count_favorites(db.session.connection(), entity_type, [(user_id, row["entity_id"]) for index, row in to_insert])
+    report = insert_rows(Favorite, to_insert, report, "entity_id",
+                         Favorite.user_id == user_id, Favorite.entity_type == entity_type)
+    # the report speaks the language of the request, character_id instead of entity_type + entity_id
+    for entry in report:
+        if "entity_id" in entry:
+            del entry["entity_type"]
+            entry[entity_key] = entry.pop("entity_id")
+    return report
+
+def bulk_delete(model, ids, *criteria, counter=None):
+    """
+    Deletes the rows of `model` whose id is in `ids` (and match `criteria`) with a single DELETE,
+    in the same transaction every deleted row bumps its data_version counter "<counter>:<id>"
+    """
+    parsed = [(row_id, as_id(row_id)) for row_id in ids]
+    valid = {row_id for raw, row_id in parsed if row_id is not None}
+    deleted = set(db.session.scalars(db.select(model.id).where(model.id.in_(valid), *criteria))) if valid else set()
+    if deleted:
+        forget_favorites(db.session.connection(), model, deleted)
+        delete_favorites_of(db.session.connection(), model, deleted)
+        db.session.execute(delete(model).where(model.id.in_(deleted)))
+        if counter is not None:
+            bump_versions(*(f"{counter}:{row_id}" for row_id in deleted))
+    db.session.commit()
+    return [{"id": raw, "Error": "The id must be an integer"} if row_id is None
+            else {"id": row_id, "Deleted": row_id in deleted} for raw, row_id in parsed]
+
+def delete_returning(model, row_id, column, counter=None):
+    """
+    Deletes the `model` row with `row_id` and returns the row with its `column`, None when it
+    does not exist. A single DELETE ... RETURNING where the database supports it (a SELECT
+    first otherwise), the favorites of a user go with the ON DELETE CASCADE of their foreign key
+    and the ones of a character or a planet with one more DELETE. A deleted row bumps its
+    data_version counter "<counter>:<id>" in the same transaction.
+    """
+    forget_favorites(db.session.connection(), model, [row_id])
+    delete_favorites_of(db.session.connection(), model, [row_id])
+    statement = delete(model).where(model.id == row_id).execution_options(synchronize_session=False)
+    if db.session.get_bind().dialect.delete_returning:
+        row = db.session.execute(statement.returning(getattr(model, column))).first()
+    else:
+        row = db.session.execute(db.select(getattr(model, column)).where(model.id == row_id)).first()
+        db.session.execute(statement)
+    if row is not None and counter is not None:
+        bump_versions(f"{counter}:{row_id}")
+    db.session.commit()
+    return row
+
+def delete_favorites(entity_type, *criteria):
+    """Deletes every favorite of `entity_type` matching `criteria` with a single DELETE, returns how many went"""
+    forget_favorites_where(db.session.connection(), entity_type, and_(*criteria))
+    deleted = db.session.execute(delete(Favorite).where(Favorite.entity_type == entity_type, *criteria)
+                                 .execution_options(synchronize_session=False))
+    db.session.commit()
+    return deleted.rowcount
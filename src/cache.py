@@ -0,0 +1,217 @@
+"""
+Read-through cache for the catalog GET endpoints.
+Responses are stored in a backend (in-process LRU by default, Redis when CACHE_URL is set)
+under keys that carry a data_version counter (see versions.py): the counter of the table
+for the lists ("characters"), the counter of the row for the items ("characters:<id>"),
+so adding a character leaves the cached items alone and deleting one only drops its own.
+A write bumps the counters in the database, so every worker misses the old entries from
+its next request on, they are never read again and go with the LRU or their TTL.
+Concurrent misses of the same key inside a worker are coalesced: one request runs
+the view and the others wait for its body instead of running the same query.
+Each entry also keeps the compressed encodings of its body, built once when it is filled.
+"""
+import os
+import time
+import pickle
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+from flask import request, Response, g
+from utils import wants_ndjson
+from versions import current_versions
+
+class CacheBackend(ABC):
+    """
+    What ResponseCache needs from a storage, entries may disappear at any time.
+    A backend that misses one of the methods fails when it is built.
+    """
+    evictions = 0
+
+    @abstractmethod
+    def get(self, key):
+        ...
+
+    @abstractmethod
+    def set(self, key, value, ttl):
+        ...
+
+class LRUBackend(CacheBackend):
+    """In-process LRU with a TTL per entry, shared by the threads of one worker"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                self.evictions += 1
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+class RedisBackend(CacheBackend):
+    """Shared backend for several workers, needs the `redis` package"""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(key, pickle.dumps(value), ex=ttl)
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Runs one call per key at a time, the threads that ask for a key already in
+    flight wait for that call and get its result (or its exception).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.coalesced = 0
+
+    def do(self, key, function):
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = function()
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+        return flight.result
+
+class ResponseCache:
+    def __init__(self, backend, ttl=60, compressor=None):
+        self.backend = backend
+        self.ttl = ttl
+        self.compressor = compressor
+        self.flights = SingleFlight()
+        # the threads of a gthread worker share the counters
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def list_key(self, namespace, version):
+        return f"{namespace}:list:{version}:{request.full_path}"
+
+    def item_key(self, namespace, version, item_id):
+        # the item routes take no query string, so the key is the exact path
+        return f"{namespace}:item:{version}:{item_id}"
+
+    def cached(self, namespace, item_arg=None):
+        """
+        Caches the successful responses of a GET view, `namespace` is the data_version
+        counter of its table. Lists are keyed on route + query string and that counter,
+        items on their id and the counter of the row, "<namespace>:<id>".
+        On a miss the view runs once per key, concurrent requests for the same key share its body.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if wants_ndjson():
+                    return view(*args, **kwargs)
+                counter = namespace if item_arg is None else f"{namespace}:{kwargs[item_arg]}"
+                # the counter the ETag was built from when @conditional runs first
+                version = g.get("data_versions", {}).get(counter)
+                if version is None:
+                    version, = current_versions([counter])
+                if item_arg is None:
+                    key = self.list_key(namespace, version)
+                else:
+                    key = self.item_key(namespace, version, kwargs[item_arg])
+
+                entry = self.backend.get(key)
+                with self.lock:
+                    if entry is not None:
+                        self.hits += 1
+                    else:
+                        self.misses += 1
+                if entry is None:
+                    entry = self.flights.do(key, lambda: self.fill(key, view, args, kwargs))
+                # a Response is never shared between threads, every request builds its own from the bytes
+                body, status, headers, encoded = entry
+                encoding = self.compressor.negotiate() if encoded else None
+                if encoding in encoded:
+                    headers = headers + [("Content-Encoding", encoding)]
+                    body = encoded[encoding]
+                return Response(body, status=status, headers=headers), status
+            return wrapper
+        return decorator
+
+    def fill(self, key, view, args, kwargs):
+        """
+        Runs the view and returns its (body, status, headers, {encoding: body}),
+        storing them when the status is 200
+        """
+        response, status = view(*args, **kwargs)
+        headers = [(name, value) for name, value in response.headers if name != "Content-Length"]
+        body = response.get_data()
+        encoded = {}
+        if status == 200 and self.compressor is not None:
+            encoded = self.compressor.encode_all(body)
+        entry = (body, status, headers, encoded)
+        if status == 200:
+            self.backend.set(key, entry, self.ttl)
+        return entry
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "coalesced": self.flights.coalesced,
+        }
+
+def setup_cache(app, compressor=None):
+    app.config.setdefault('CACHE_TTL', int(os.environ.get('CACHE_TTL', 60)))
+    app.config.setdefault('CACHE_MAX_ENTRIES', int(os.environ.get('CACHE_MAX_ENTRIES', 1024)))
+    app.config.setdefault('CACHE_URL', os.environ.get('CACHE_URL'))
+
+    if app.config['CACHE_URL']:
+        backend = RedisBackend(app.config['CACHE_URL'])
+    else:
+        backend = LRUBackend(app.config['CACHE_MAX_ENTRIES'])
+    return ResponseCache(backend, ttl=app.config['CACHE_TTL'], compressor=compressor)
@@ -0,0 +1,76 @@
+"""
+Negotiated response compression.
+Bodies of at least COMPRESS_MIN_SIZE bytes are encoded with the best encoding the
+client accepts: brotli when the `brotli` package is installed, gzip otherwise.
+The catalog cache stores every encoding of a body next to it (see cache.py), so a
+cached response is sent as it is, without serializing or compressing it again.
+Set COMPRESS_ENABLED=false to send everything as identity.
+"""
+import gzip
+from flask import request
+from database import env_setting
+from metrics import timing
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/html", "text/plain")
+
+class Compressor:
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=5, enabled=True):
+        self.min_size = min_size
+        self.enabled = enabled
+        # preferred first, best_match keeps this order when the client gives the same q to both
+        self.encoders = {}
+        if brotli is not None:
+            self.encoders["br"] = lambda body: brotli.compress(body, quality=brotli_quality)
+        self.encoders["gzip"] = lambda body: gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+    def negotiate(self):
+        """The encoding to use for this request, None for identity"""
+        if not self.enabled:
+            return None
+        return request.accept_encodings.best_match(list(self.encoders))
+
+    def worth_it(self, response):
+        return (response.status_code == 200 and not response.is_streamed
+                and response.mimetype in COMPRESSIBLE_MIMETYPES
+                and response.calculate_content_length() >= self.min_size)
+
+    def encode_all(self, body):
+        """{encoding: bytes} for a body that is going to be cached, empty when it is too small"""
+        if not self.enabled or len(body) < self.min_size:
+            return {}
+        with timing("compress"):
+            return {encoding: encode(body) for encoding, encode in self.encoders.items()}
+
+    def compress_response(self, response):
+        """after_request hook, compresses the responses that the cache did not send already encoded"""
+        if not self.enabled or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add("Accept-Encoding")
+        if "Content-Encoding" not in response.headers:
+            encoding = self.negotiate() if self.worth_it(response) else None
+            if encoding is None:
+                return response
+            with timing("compress"):
+                response.set_data(self.encoders[encoding](response.get_data()))
+            response.headers["Content-Encoding"] = encoding
+        # the compressed bytes are another representation, so the ETag can only be a weak one
+        etag, weak = response.get_etag()
+        if etag is not None and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+def setup_compression(app):
+    app.config.setdefault('COMPRESS_ENABLED', env_setting('COMPRESS_ENABLED', True))
+    app.config.setdefault('COMPRESS_MIN_SIZE', env_setting('COMPRESS_MIN_SIZE', 1024))
+    app.config.setdefault('COMPRESS_GZIP_LEVEL', env_setting('COMPRESS_GZIP_LEVEL', 6))
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', env_setting('COMPRESS_BROTLI_QUALITY', 5))
+
+    compressor = Compressor(app.config['COMPRESS_MIN_SIZE'], app.config['COMPRESS_GZIP_LEVEL'],
+                            app.config['COMPRESS_BROTLI_QUALITY'], enabled=app.config['COMPRESS_ENABLED'])
+    app.after_request(compressor.compress_response)
+    return compressor
@@ -0,0 +1,106 @@
+"""
+Denormalized favorite counters: character.favorites_count, planet.favorites_count and
+user.favorite_characters_count / user.favorite_planets_count, counted from the favorite table.
+They move by +n / -n in the same transaction as the favorites they count:
+- ORM writes (the single handlers, the admin and the favorites that go with a deleted
+  user, character or planet) through the mapper events below,
+- the Core writes of bulk.py by calling `count_favorites` / `forget_favorites` directly,
+  deletes are taken off with set-based UPDATEs and never load the favorites.
+Anything else (raw SQL, a favorite edited in the admin) can make them drift,
+`flask rebuild-counters` compares them with a GROUP BY and repairs them.
+"""
+from collections import Counter, defaultdict
+import click
+from sqlalchemy import event, func, update, and_
+from models import db, User, Character, Planet, Favorite
+
+# entity type -> (entity model, counter column of the user)
+FAVORITES = {
+    "character": (Character, "favorite_characters_count"),
+    "planet": (Planet, "favorite_planets_count"),
+}
+
+def add_to_counters(connection, model, column, amounts):
+    # one UPDATE ... WHERE id IN (...) per distinct amount, usually a single one
+    ids_by_amount = defaultdict(list)
+    for row_id, amount in amounts.items():
+        ids_by_amount[amount].append(row_id)
+    counter = getattr(model, column)
+    for amount, ids in ids_by_amount.items():
+        connection.execute(update(model).where(model.id.in_(ids)).values({column: counter + amount}))
+
+def count_favorites(connection, entity_type, pairs):
+    """`pairs` are the (user_id, entity_id) of favorites of `entity_type` that were added"""
+    if not pairs:
+        return
+    entity_model, user_column = FAVORITES[entity_type]
+    add_to_counters(connection, entity_model, "favorites_count", Counter(t for u, t in pairs))
+    add_to_counters(connection, User, user_column, Counter(u for u, t in pairs))
+
+def forget_favorites_where(connection, entity_type, condition):
+    """
+    Call it before deleting the favorites of `entity_type` that match `condition`, it takes
+    them off the counters with one UPDATE per counter and never loads the favorites
+    """
+    entity_model, user_column = FAVORITES[entity_type]
+    condition = and_(Favorite.entity_type == entity_type, condition)
+    for model, column, key in ((entity_model, "favorites_count", Favorite.entity_id), (User, user_column, Favorite.user_id)):
+        gone = db.select(func.count()).where(condition, key == model.id).scalar_subquery()
+        connection.execute(update(model).where(model.id.in_(db.select(key).where(condition)))
+                           .values({column: getattr(model, column) - gone}))
+
+def favorites_condition(entity_type, model, ids):
+    """What the favorites of `entity_type` that go with the `model` rows with `ids` match, None if they do not depend on them"""
+    entity_model, user_column = FAVORITES[entity_type]
+    if model is Favorite:
+        return Favorite.id.in_(ids)
+    if model is entity_model:
+        return Favorite.entity_id.in_(ids)
+    if model is User:
+        return Favorite.user_id.in_(ids)
+    return None
+
+def forget_favorites(connection, model, ids):
+    """Call it before deleting the `model` rows with `ids`, it takes their favorites off the counters"""
+    for entity_type in FAVORITES:
+        condition = favorites_condition(entity_type, model, ids)
+        if condition is not None:
+            forget_favorites_where(connection, entity_type, condition)
+
+def favorite_added(mapper, connection, favorite):
+    count_favorites(connection, favorite.entity_type, [(favorite.user_id, favorite.entity_id)])
+
+def row_deleted(mapper, connection, row):
+    forget_favorites(connection, type(row), [row.id])
+
+event.listen(Favorite, "after_insert", favorite_added)
+for model in (User, Character, Planet, Favorite):
+    event.listen(model, "before_delete", row_deleted)
+
+def counter_checks():
+    """(model, counter column, correlated COUNT(*) of its favorites) for every counter"""
+    for entity_type, (entity_model, user_column) in FAVORITES.items():
+        of_type = Favorite.entity_type == entity_type
+        yield entity_model, "favorites_count", db.select(func.count()).where(
+            of_type, Favorite.entity_id == entity_model.id).scalar_subquery()
+        yield User, user_column, db.select(func.count()).where(of_type, Favorite.user_id == User.id).scalar_subquery()
+
+def rebuild_counters(repair=True):
+    """Returns {"<table>.<column>": rows that drifted}, and fixes them unless repair is False"""
+    drift = {}
+    for model, column, actual in counter_checks():
+        counter = getattr(model, column)
+        drifted = db.session.scalar(db.select(func.count()).select_from(model).where(counter != actual))
+        drift[f"{model.__tablename__}.{column}"] = drifted
+        if drifted and repair:
+            db.session.execute(update(model).where(counter != actual).values({column: actual}))
+    db.session.commit()
+    return drift
+
+def setup_counters(app):
+    @app.cli.command("rebuild-counters")
+    @click.option("--check", is_flag=True, help="Only report the drift, do not repair it")
+    def rebuild_counters_command(check):
+        """Recounts the favorite counters and repairs the ones that drifted"""
+        for name, drifted in rebuild_counters(repair=not check).items():
+            click.echo(f"{name}: {drifted} drifted" + ("" if check or not drifted else ", repaired"))
@@ -0,0 +1,85 @@
+"""
+Database URL and SQLAlchemy engine options.
+Every option has a default per backend and can be overridden with an environment variable:
+DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE (seconds),
+DB_POOL_PRE_PING (true/false) and DB_STATEMENT_TIMEOUT (milliseconds, 0 disables it).
+"""
+import os
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+DEFAULT_DATABASE_URL = "sqlite:////tmp/test.db"
+
+DIALECT_DEFAULTS = {
+    "postgresql": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout": 30000,
+    },
+    "mysql": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        # below MySQL's wait_timeout, connections are closed by the server after that
+        "pool_recycle": 280,
+        "pool_pre_ping": True,
+        "statement_timeout": 30000,
+    },
+    # a local file, there is nothing to recycle or ping
+    "sqlite": {
+        "pool_pre_ping": False,
+        "statement_timeout": 0,
+    },
+}
+
+def get_database_url():
+    db_url = os.getenv("DATABASE_URL")
+    if db_url is not None:
+        return db_url.replace("postgres://", "postgresql://")
+    return DEFAULT_DATABASE_URL
+
+def env_setting(name, default):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    if isinstance(default, bool):
+        return value.lower() in ("1", "true", "yes", "on")
+    return int(value)
+
+def engine_options(db_url):
+    url = make_url(db_url)
+    dialect = url.get_backend_name()
+    defaults = DIALECT_DEFAULTS.get(dialect, {})
+
+    options = {}
+    for option in ("pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping"):
+        if option in defaults:
+            options[option] = env_setting(f"DB_{option.upper()}", defaults[option])
+
+    statement_timeout = env_setting("DB_STATEMENT_TIMEOUT", defaults.get("statement_timeout", 0))
+    if statement_timeout and dialect == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    elif statement_timeout and dialect == "mysql":
+        options["connect_args"] = {"init_command": f"SET SESSION max_execution_time={statement_timeout}"}
+    return options
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers work while a writer commits, NORMAL is safe with WAL and
+    # avoids an fsync per commit, and SQLite only enforces ON DELETE CASCADE with foreign_keys
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+def setup_database(app):
+    db_url = get_database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = db_url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(db_url)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
@@ -0,0 +1,66 @@
+"""
+Gunicorn settings, used by the Procfile and render.yaml:
+
+    $ gunicorn wsgi --chdir ./src/ --config ./src/gunicorn.conf.py
+
+The default worker class is gthread: every worker runs THREADS requests at a time,
+so a handler waiting on the database no longer blocks a whole process.
+SQLite is local and takes one writer at a time, so it keeps sync workers.
+Each thread can hold one pooled connection at most, so threads are sized from the
+pool (DB_POOL_SIZE + DB_MAX_OVERFLOW) and workers from the CPU count, capped so
+that workers * threads stays below DB_MAX_CONNECTIONS.
+
+Environment: WEB_WORKER_CLASS (gthread, sync or gevent), WEB_CONCURRENCY (workers),
+WEB_THREADS, WEB_TIMEOUT and DB_MAX_CONNECTIONS.
+"""
+import os
+import sys
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import get_database_url, engine_options
+
+DEFAULT_MAX_CONNECTIONS = 100
+# gevent workers run many greenlets per process, the pool is the real limit
+GEVENT_CONNECTIONS_PER_WORKER = 1000
+
+def default_worker_class(url):
+    return "sync" if url.startswith("sqlite") else "gthread"
+
+def connections_per_worker():
+    options = engine_options(get_database_url())
+    # SQLite has no pool limits, QueuePool defaults to 5 + 10 there
+    return options.get("pool_size", 5) + options.get("max_overflow", 10)
+
+def size_workers_and_threads(worker_class, cpu_count, per_worker, max_connections):
+    threads = per_worker if worker_class == "gthread" else 1
+    cpu_workers = cpu_count * 2 + 1 if worker_class == "sync" else cpu_count + 1
+    workers = max(1, min(cpu_workers, max_connections // max(per_worker, 1)))
+    return workers, threads
+
+worker_class = os.environ.get("WEB_WORKER_CLASS", default_worker_class(get_database_url()))
+default_workers, default_threads = size_workers_and_threads(
+    worker_class, multiprocessing.cpu_count(), connections_per_worker(),
+    int(os.environ.get("DB_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)))
+
+workers = int(os.environ.get("WEB_CONCURRENCY", default_workers))
+threads = int(os.environ.get("WEB_THREADS", default_threads))
+if worker_class == "gevent":
+    worker_connections = GEVENT_CONNECTIONS_PER_WORKER
+timeout = int(os.environ.get("WEB_TIMEOUT", 30))
+
+def post_fork(server, worker):
+    if worker_class == "gevent":
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning("psycogreen is not installed, psycopg2 calls will block the gevent loop")
+
+    # with --preload the parent may have opened connections, a child must never reuse them
+    if "app" in sys.modules:
+        from app import app
+        from models import db
+        with app.app_context():
+            db.engine.dispose(close=False)
@@ -0,0 +1,144 @@
+"""
+Per request instrumentation.
+Records latency and response size histograms per route and the number and time
+of the SQL queries run by each request, renders them in the Prometheus text
+format and adds a Server-Timing header to every response: db (SQL), serialize
+(encoding the JSON body), compress, app (everything else: routing, hooks, the views
+themselves) and total.
+Set SLOW_QUERY_MS to log every statement slower than that.
+Counters live in the worker process, each gunicorn worker exposes its own.
+"""
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from flask import g, request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+# the parts of Server-Timing measured with `timing`, db is counted by the engine events
+TIMED_PARTS = ("serialize", "compress")
+
+logger = logging.getLogger("slow_query")
+
+@contextmanager
+def timing(part):
+    """Adds the time spent in the block to the `part` (one of TIMED_PARTS) of this request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_request_context() and "request_start" in g:
+            g.timings[part] += time.perf_counter() - start
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, the bodies built by jsonify count as serialize"""
+
+    def response(self, *args, **kwargs):
+        with timing("serialize"):
+            return super().response(*args, **kwargs)
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [count per bucket..., +Inf count, sum]
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0])
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for (method, route, status), series in sorted(self.series.items()):
+            labels = f'method="{method}",route="{route}",status="{status}"'
+            for index, bound in enumerate(self.buckets):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {series[index]}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series[len(self.buckets)]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{labels}}} {series[len(self.buckets)]}")
+        return lines
+
+class Metrics:
+    def __init__(self, slow_query_ms=None):
+        self.slow_query_ms = slow_query_ms
+        self.lock = threading.Lock()
+        self.latency = Histogram("http_request_duration_seconds", "Time spent handling the request.", LATENCY_BUCKETS)
+        self.size = Histogram("http_response_size_bytes", "Size of the response body.", SIZE_BUCKETS)
+        self.queries = Histogram("http_request_db_queries", "SQL statements executed per request.", QUERY_BUCKETS)
+        self.db_time = Histogram("http_request_db_duration_seconds", "Time spent in SQL statements per request.", LATENCY_BUCKETS)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        if has_request_context() and "request_start" in g:
+            g.db_queries += 1
+            g.db_time += elapsed
+        if self.slow_query_ms is not None and elapsed * 1000 >= self.slow_query_ms:
+            logger.warning("slow query (%.1f ms): %s", elapsed * 1000, statement)
+
+    def handle_error(self, exception_context):
+        # a failed statement never reaches after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+    def start_request(self):
+        g.request_start = time.perf_counter()
+        g.db_queries = 0
+        g.db_time = 0.0
+        g.timings = dict.fromkeys(TIMED_PARTS, 0.0)
+
+    def finish_request(self, response):
+        if "request_start" not in g:
+            return response
+        total = time.perf_counter() - g.request_start
+        rest = max(total - g.db_time - sum(g.timings.values()), 0.0)
+        parts = "".join(f"{part};dur={elapsed * 1000:.2f}, " for part, elapsed in g.timings.items())
+        response.headers["Server-Timing"] = (
+            f"db;dur={g.db_time * 1000:.2f};desc=\"{g.db_queries} queries\", "
+            f"{parts}app;dur={rest * 1000:.2f}, total;dur={total * 1000:.2f}")
+
+        rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        labels = (request.method, rule, response.status_code)
+        with self.lock:
+            self.latency.observe(labels, total)
+            self.queries.observe(labels, g.db_queries)
+            self.db_time.observe(labels, g.db_time)
+            if not response.is_streamed:
+                self.size.observe(labels, response.calculate_content_length() or 0)
+        return response
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for histogram in (self.latency, self.size, self.queries, self.db_time):
+                lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+def setup_metrics(app):
+    slow_query_ms = os.environ.get('SLOW_QUERY_MS')
+    app.config.setdefault('SLOW_QUERY_MS', float(slow_query_ms) if slow_query_ms else None)
+
+    metrics = Metrics(app.config['SLOW_QUERY_MS'])
+    app.json = TimedJSONProvider(app)
+    event.listen(Engine, "before_cursor_execute", metrics.before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", metrics.after_cursor_execute)
+    event.listen(Engine, "handle_error", metrics.handle_error)
+    app.before_request(metrics.start_request)
+    app.after_request(metrics.finish_request)
+    return metrics
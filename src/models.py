@@ -1,15 +1,39 @@
+import math
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
 db = SQLAlchemy()
 
+def parse_number(value):
+    """ "1,000" -> 1000.0, "unknown" / "n/a" / None -> None """
+    if value is None:
+        return None
+    try:
+        number = float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+def number_of(column):
+    # column default that fills a numeric shadow column from its text column,
+    # it also runs for the executemany inserts of bulk.py
+    return lambda context: parse_number(context.get_current_parameters().get(column))
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password = db.Column(db.String(80), unique=False, nullable=False)
+    # a KDF hash, see passwords.py
+    password = db.Column(db.String(255), unique=False, nullable=False)
     username = db.Column(db.String(120), unique=True, nullable=False)
     first_name = db.Column(db.String(120), unique=False, nullable=True)
     last_name = db.Column(db.String(120), unique=False, nullable=True)
     is_active = db.Column(db.Boolean(), unique=False, nullable=False)
+    # kept up to date by counters.py
+    favorite_characters_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    favorite_planets_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # columns that can be exposed through the API (never the password)
+    public_fields = ("id", "email", "username", "first_name", "last_name", "is_active")
 
     def __repr__(self):
         return f"<User {self.email}>"
@@ -28,9 +52,15 @@ class User(db.Model):
 class Character(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
-    specie = db.Column(db.String(50), unique=False, nullable=False)
+    specie = db.Column(db.String(50), unique=False, nullable=False, index=True)
     height = db.Column(db.String(20), unique=False, nullable=False)
     gender = db.Column(db.String(20), unique=False, nullable=False)
+    # typed copy of height for range queries and sorting, NULL when it is not a number
+    height_number = db.Column(db.Float, nullable=True, index=True, default=number_of("height"))
+    # how many users have it in their favorites (counters.py), indexed for /characters/popular
+    favorites_count = db.Column(db.Integer, nullable=False, default=0, server_default="0", index=True)
+
+    public_fields = ("name", "specie", "height", "gender", "id")
 
     def __repr__(self):
         return f"<Character {self.id}>"
@@ -48,8 +78,13 @@ class Planet(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
     population = db.Column(db.String(50), unique=False, nullable=False)
-    terrain = db.Column(db.String(100), unique=False, nullable=False)
+    terrain = db.Column(db.String(100), unique=False, nullable=False, index=True)
     diameter = db.Column(db.String(50), unique=False, nullable=False)
+    population_number = db.Column(db.Float, nullable=True, index=True, default=number_of("population"))
+    diameter_number = db.Column(db.Float, nullable=True, index=True, default=number_of("diameter"))
+    favorites_count = db.Column(db.Integer, nullable=False, default=0, server_default="0", index=True)
+
+    public_fields = ("name", "population", "terrain", "diameter", "id")
 
     def __repr__(self):
         return f"<Planet {self.id}>"
@@ -63,36 +98,64 @@ class Planet(db.Model):
             "id": self.id,
         }
     
-class Character_fav(db.Model):
+# the shadow columns always come from the text ones, whatever was set on the object
+@event.listens_for(Character, "before_insert")
+@event.listens_for(Character, "before_update")
+def update_character_numbers(mapper, connection, character):
+    character.height_number = parse_number(character.height)
+
+@event.listens_for(Planet, "before_insert")
+@event.listens_for(Planet, "before_update")
+def update_planet_numbers(mapper, connection, planet):
+    planet.population_number = parse_number(planet.population)
+    planet.diameter_number = parse_number(planet.diameter)
+
+class Favorite(db.Model):
+    # the favorites of every entity in one table, entity_type names the table entity_id belongs to (FAVORITE_ENTITIES)
+    __table_args__ = (
+        # a user's favorites are one range scan of this index, it covers the id too (the rowid on SQLite)
+        db.Index("ix_favorite_user_id_entity_type_entity_id", "user_id", "entity_type", "entity_id",
+                 unique=True, postgresql_include=["id"]),
+        db.Index("ix_favorite_entity_type_entity_id", "entity_type", "entity_id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    character_id = db.Column(db.Integer, db.ForeignKey('character.id'))
-    character = db.relationship(Character)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete="CASCADE"), nullable=False)
     user = db.relationship(User)
+    entity_type = db.Column(db.String(20), nullable=False)
+    # no foreign key can point to two tables, the favorites of a deleted entity go with delete_favorites_of
+    entity_id = db.Column(db.Integer, nullable=False)
 
     def __repr__(self):
-        return f"<Character_fav {self.character_id}>"
+        return f"<Favorite {self.entity_type} {self.entity_id}>"
 
     def serialize(self):
+        entity = db.session.get(FAVORITE_ENTITIES[self.entity_type], self.entity_id)
         return {
             "id": self.id,
-            "character_id": self.character_id,
-            "character_name": self.character.name,
+            f"{self.entity_type}_id": self.entity_id,
+            f"{self.entity_type}_name": entity.name,
         }
-    
-class Planet_fav(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    planet_id = db.Column(db.Integer, db.ForeignKey('planet.id'))
-    planet = db.relationship(Planet)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    user = db.relationship(User)
 
-    def __repr__(self):
-        return f"<Planet_fav {self.id}>"
+# what can be a favorite, by entity_type
+FAVORITE_ENTITIES = {"character": Character, "planet": Planet}
+ENTITY_TYPES = {model: entity_type for entity_type, model in FAVORITE_ENTITIES.items()}
 
-    def serialize(self):
-        return {
-            "id": self.id,
-            "planet_id": self.planet_id,
-            "planet_name": self.planet.name,
-        }
\ No newline at end of file
+def delete_favorites_of(connection, model, ids):
+    """Deletes the favorites of the `model` rows with `ids`, the job ON DELETE CASCADE does for the users"""
+    entity_type = ENTITY_TYPES.get(model)
+    if entity_type is not None and ids:
+        connection.execute(db.delete(Favorite).where(Favorite.entity_type == entity_type, Favorite.entity_id.in_(ids)))
+
+@event.listens_for(Character, "after_delete")
+@event.listens_for(Planet, "after_delete")
+def entity_deleted(mapper, connection, entity):
+    delete_favorites_of(connection, type(entity), [entity.id])
+
+class Data_version(db.Model):
+    # one counter per table (or per user for favorites), bumped by every write, used for the ETags
+    name = db.Column(db.String(120), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<Data_version {self.name} {self.version}>"
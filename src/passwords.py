@@ -0,0 +1,121 @@
+"""
+Password hashing with the stdlib KDFs (hashlib.scrypt or hashlib.pbkdf2_hmac).
+The cost is read from the environment:
+PASSWORD_HASHER (scrypt or pbkdf2), SCRYPT_N, SCRYPT_R, SCRYPT_P, PBKDF2_ITERATIONS,
+PASSWORD_HASH_WORKERS (threads doing KDF work) and PASSWORD_HASH_QUEUE (jobs allowed to wait).
+Both KDFs release the GIL, so the hashes run in a small thread pool: at most
+PASSWORD_HASH_WORKERS cores burn on them and the other request threads keep going.
+When the queue is full the request gets a 503 instead of piling up.
+Stored format: scrypt$n$r$p$salt$hash or pbkdf2_sha256$iterations$salt$hash (base64),
+anything else is an old plain text password, which `verify` still accepts once so
+the login can replace it (see `needs_rehash`).
+"""
+import os
+import hmac
+import base64
+import hashlib
+import threading
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
+from utils import APIException
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+DEFAULTS = {
+    "PASSWORD_HASHER": "scrypt",
+    # 16 MiB and ~50 ms per hash
+    "SCRYPT_N": 2 ** 14,
+    "SCRYPT_R": 8,
+    "SCRYPT_P": 1,
+    "PBKDF2_ITERATIONS": 600000,
+    "PASSWORD_HASH_QUEUE": 64,
+}
+
+def b64encode(data):
+    return base64.b64encode(data).decode().rstrip("=")
+
+def b64decode(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def scrypt(password, salt, n, r, p):
+    # OpenSSL refuses to use more than `maxmem`, scrypt needs 128 * n * r * p bytes
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * n * r * (p + 1) + 1024 * 1024, dklen=HASH_BYTES)
+
+def pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=HASH_BYTES)
+
+class PasswordHasher:
+    def __init__(self, algorithm="scrypt", scrypt_n=2 ** 14, scrypt_r=8, scrypt_p=1,
+                 pbkdf2_iterations=600000, workers=1, queue=64):
+        if algorithm not in ("scrypt", "pbkdf2"):
+            raise ValueError(f"Unknown password hasher '{algorithm}'")
+        self.algorithm = algorithm
+        self.scrypt_params = (scrypt_n, scrypt_r, scrypt_p)
+        self.pbkdf2_iterations = pbkdf2_iterations
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        # running + waiting jobs, a full pool answers 503 right away
+        self.slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, function, *args):
+        if not self.slots.acquire(blocking=False):
+            raise APIException("The server is busy, try again in a moment", status_code=503)
+        try:
+            return self.pool.submit(function, *args).result()
+        finally:
+            self.slots.release()
+
+    def encode(self, password):
+        salt = os.urandom(SALT_BYTES)
+        if self.algorithm == "scrypt":
+            n, r, p = self.scrypt_params
+            return f"scrypt${n}${r}${p}${b64encode(salt)}${b64encode(scrypt(password, salt, n, r, p))}"
+        iterations = self.pbkdf2_iterations
+        return f"pbkdf2_sha256${iterations}${b64encode(salt)}${b64encode(pbkdf2(password, salt, iterations))}"
+
+    def check(self, password, stored):
+        parts = stored.split("$")
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = (int(part) for part in parts[1:4])
+            expected = scrypt(password, b64decode(parts[4]), n, r, p)
+        elif parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            expected = pbkdf2(password, b64decode(parts[2]), int(parts[1]))
+        else:
+            return hmac.compare_digest(password.encode(), stored.encode())
+        return hmac.compare_digest(expected, b64decode(parts[-1]))
+
+    def hash(self, password):
+        """Returns the string to store for `password`"""
+        if not isinstance(password, str):
+            raise APIException("The password must be a string")
+        return self.run(self.encode, password)
+
+    def verify(self, password, stored):
+        if not isinstance(password, str):
+            return False
+        return self.run(self.check, password, stored)
+
+    @cached_property
+    def dummy_hash(self):
+        # checked when there is no user, so a wrong username takes as long as a wrong password,
+        # made in the pool like every other hash
+        return self.run(self.encode, b64encode(os.urandom(SALT_BYTES)))
+
+    def is_hash(self, stored):
+        return stored.startswith(("scrypt$", "pbkdf2_sha256$"))
+
+    def needs_rehash(self, stored):
+        """True when `stored` was not made with the current algorithm and cost"""
+        if self.algorithm == "scrypt":
+            return not stored.startswith("scrypt${}${}${}$".format(*self.scrypt_params))
+        return not stored.startswith(f"pbkdf2_sha256${self.pbkdf2_iterations}$")
+
+def setup_passwords(app):
+    for name, default in DEFAULTS.items():
+        value = os.environ.get(name)
+        app.config.setdefault(name, default if value in (None, "") else type(default)(value))
+    app.config.setdefault('PASSWORD_HASH_WORKERS', int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)))
+
+    return PasswordHasher(app.config['PASSWORD_HASHER'], app.config['SCRYPT_N'], app.config['SCRYPT_R'],
+                          app.config['SCRYPT_P'], app.config['PBKDF2_ITERATIONS'],
+                          app.config['PASSWORD_HASH_WORKERS'], app.config['PASSWORD_HASH_QUEUE'])
@@ -0,0 +1,126 @@
+"""
+Token bucket rate limiting for the hot read endpoints.
+Every (client, route) pair has a bucket of RATE_LIMIT_BURST tokens that refills at
+RATE_LIMIT requests per second. A request takes one token, an empty bucket answers
+429 with a Retry-After header. Buckets live in the worker (in-memory backend) or in
+Redis when RATE_LIMIT_URL is set, so every worker shares them.
+The client is request.remote_addr. Behind a reverse proxy set TRUSTED_PROXIES to the
+number of proxies in front of the app, the address they forward in X-Forwarded-For is
+used instead of theirs (otherwise every client would share the proxy's buckets).
+"""
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+from abc import ABC, abstractmethod
+from functools import wraps
+from flask import request, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
+from database import env_setting
+
+class RateLimitBackend(ABC):
+    """
+    What RateLimiter needs from a storage. `take` must be atomic per key and
+    return (allowed, seconds until a token is available).
+    """
+
+    @abstractmethod
+    def take(self, key, rate, burst):
+        ...
+
+class MemoryBackend(RateLimitBackend):
+    """
+    Buckets of one worker, a bucket is (tokens, last refill). At most `max_keys` of them,
+    the one used least recently goes first (its client starts again with a full bucket).
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+# KEYS[1] bucket, ARGV rate, burst, now; the whole refill + take runs as one step in Redis
+TAKE_SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'last')
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens, last = tonumber(bucket[1]) or burst, tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(now - last, 0) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'last', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+class RedisBackend(RateLimitBackend):
+    """Buckets shared by every worker, needs the `redis` package"""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(TAKE_SCRIPT)
+
+    def take(self, key, rate, burst):
+        # the clock of the caller, workers on one machine agree on it
+        allowed, tokens = self.script(keys=[f"ratelimit:{key}"], args=[rate, burst, time.time()])
+        return bool(allowed), 0 if allowed else (1 - float(tokens)) / rate
+
+class RateLimiter:
+    def __init__(self, backend, rate=20, burst=40, enabled=True):
+        self.backend = backend
+        self.rate = rate
+        self.burst = burst
+        self.enabled = enabled
+
+    def limit(self, rate=None, burst=None):
+        """Limits a view per client address and route, `rate` and `burst` override the defaults"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+                key = f"{request.remote_addr}:{request.url_rule.rule}"
+                allowed, retry_after = self.backend.take(key, rate or self.rate, burst or self.burst)
+                if not allowed:
+                    response = jsonify({"Error": "Too many requests, slow down"})
+                    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+                    return response, 429
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+def setup_rate_limit(app):
+    app.config.setdefault('RATE_LIMIT_ENABLED', env_setting('RATE_LIMIT_ENABLED', True))
+    app.config.setdefault('RATE_LIMIT', float(os.environ.get('RATE_LIMIT', 20)))
+    app.config.setdefault('RATE_LIMIT_BURST', env_setting('RATE_LIMIT_BURST', 40))
+    app.config.setdefault('RATE_LIMIT_URL', os.environ.get('RATE_LIMIT_URL'))
+    app.config.setdefault('TRUSTED_PROXIES', env_setting('TRUSTED_PROXIES', 0))
+
+    if app.config['TRUSTED_PROXIES']:
+        # only the last TRUSTED_PROXIES addresses of X-Forwarded-For are trusted, a client can not fake its own
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+
+    if app.config['RATE_LIMIT_URL']:
+        backend = RedisBackend(app.config['RATE_LIMIT_URL'])
+    else:
+        backend = MemoryBackend()
+    return RateLimiter(backend, app.config['RATE_LIMIT'], app.config['RATE_LIMIT_BURST'],
+                       enabled=app.config['RATE_LIMIT_ENABLED'])
@@ -0,0 +1,106 @@
+"""
+Name search over characters and planets.
+- PostgreSQL: trigram GIN indexes on the name columns (pg_trgm), ranked by similarity.
+- SQLite: an FTS5 table kept in sync by triggers, ranked by bm25.
+- Anything else: a prefix LIKE served by the unique index on name.
+Every write path (single, bulk, admin) goes through the database, so the index never goes stale.
+"""
+from sqlalchemy import event, literal, func, union_all
+from models import db, Character, Planet
+
+ENTITY_MODELS = {"character": Character, "planet": Planet}
+# FTS5 rowids are the entity id shifted left, the low bit tells the entity type
+ENTITY_PARITY = {"character": 0, "planet": 1}
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(name, prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS character_search_insert AFTER INSERT ON character BEGIN "
+    "INSERT INTO search_index(rowid, name) VALUES (new.id * 2, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS character_search_delete AFTER DELETE ON character BEGIN "
+    "DELETE FROM search_index WHERE rowid = old.id * 2; END",
+    "CREATE TRIGGER IF NOT EXISTS character_search_update AFTER UPDATE OF name ON character BEGIN "
+    "UPDATE search_index SET name = new.name WHERE rowid = old.id * 2; END",
+    "CREATE TRIGGER IF NOT EXISTS planet_search_insert AFTER INSERT ON planet BEGIN "
+    "INSERT INTO search_index(rowid, name) VALUES (new.id * 2 + 1, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS planet_search_delete AFTER DELETE ON planet BEGIN "
+    "DELETE FROM search_index WHERE rowid = old.id * 2 + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS planet_search_update AFTER UPDATE OF name ON planet BEGIN "
+    "UPDATE search_index SET name = new.name WHERE rowid = old.id * 2 + 1; END",
+]
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_character_name_trgm ON character USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_planet_name_trgm ON planet USING gin (name gin_trgm_ops)",
+]
+
+@event.listens_for(db.metadata, "after_create")
+def create_search_index(target, connection, **kw):
+    # db.create_all() builds the same search structures as the migrations
+    if connection.dialect.name == "sqlite":
+        statements = SQLITE_DDL
+    elif connection.dialect.name == "postgresql":
+        statements = POSTGRES_DDL
+    else:
+        return
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+@event.listens_for(db.metadata, "before_drop")
+def drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS search_index")
+
+def fts_query(q):
+    # every word becomes a quoted prefix term, so user input can not inject FTS5 syntax
+    terms = [term.replace('"', '""') for term in q.split()]
+    return " ".join(f'"{term}"*' for term in terms)
+
+def search_sqlite(q, entity_types, limit, offset):
+    parities = [ENTITY_PARITY[entity_type] for entity_type in entity_types]
+    rows = db.session.execute(db.text(
+        "SELECT rowid, name FROM search_index WHERE search_index MATCH :query "
+        f"AND rowid % 2 IN ({', '.join(str(parity) for parity in parities)}) "
+        "ORDER BY rank, length(name), name LIMIT :limit OFFSET :offset"),
+        {"query": fts_query(q), "limit": limit, "offset": offset})
+    names = {parity: entity_type for entity_type, parity in ENTITY_PARITY.items()}
+    return [(names[rowid % 2], rowid // 2, name) for rowid, name in rows]
+
+def entity_select(entity_type, where, *order_columns):
+    model = ENTITY_MODELS[entity_type]
+    return db.select(literal(entity_type).label("type"), model.id.label("id"), model.name.label("name"),
+                     *[column(model).label(f"order_{index}") for index, column in enumerate(order_columns)]
+                     ).where(where(model))
+
+def search_generic(q, entity_types, limit, offset, dialect):
+    if dialect == "postgresql":
+        # the %q% pattern is served by the trigram index, names starting with q go first
+        pattern = f"%{escape_like(q)}%"
+        order_columns = [
+            lambda model: model.name.ilike(f"{escape_like(q)}%", escape="\\"),
+            lambda model: func.similarity(model.name, q),
+        ]
+        where = lambda model: model.name.ilike(pattern, escape="\\")
+        descending = True
+    else:
+        # a prefix LIKE can walk the unique index on name
+        where = lambda model: model.name.like(f"{escape_like(q)}%", escape="\\")
+        order_columns = [lambda model: func.length(model.name)]
+        descending = False
+
+    selects = union_all(*[entity_select(entity_type, where, *order_columns) for entity_type in entity_types]).subquery()
+    order_by = [selects.c[f"order_{index}"].desc() if descending else selects.c[f"order_{index}"]
+                for index in range(len(order_columns))]
+    rows = db.session.execute(db.select(selects.c.type, selects.c.id, selects.c.name)
+                              .order_by(*order_by, selects.c.name).limit(limit).offset(offset))
+    return [tuple(row) for row in rows]
+
+def escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search(q, entity_types, limit, offset):
+    """Returns (type, id, name) tuples, best matches first"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return search_sqlite(q, entity_types, limit, offset)
+    return search_generic(q, entity_types, limit, offset, dialect)
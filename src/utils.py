@@ -1,4 +1,13 @@
-from flask import jsonify, url_for
+from urllib.parse import urlencode
+from flask import jsonify, url_for, request, Response, stream_with_context
+from serializer import dumps, rows_to_dicts, json_response
+from sqlalchemy import tuple_
+from models import db
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+EXPORT_BATCH_SIZE = 1000
+NDJSON_MIMETYPE = "application/x-ndjson"
 
 class APIException(Exception):
     status_code = 400
@@ -15,13 +24,156 @@ class APIException(Exception):
         rv['message'] = self.message
         return rv
 
+def parse_int_arg(name, default, minimum=0, maximum=None):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise APIException(f"The '{name}' query parameter must be an integer")
+    if value < minimum:
+        raise APIException(f"The '{name}' query parameter must be at least {minimum}")
+    if maximum is not None and value > maximum:
+        value = maximum
+    return value
+
+def parse_fields_arg(model):
+    fields_arg = request.args.get("fields")
+    if not fields_arg:
+        return list(model.public_fields)
+    fields = [field.strip() for field in fields_arg.split(",") if field.strip()]
+    for field in fields:
+        if field not in model.public_fields:
+            raise APIException(f"The field '{field}' can not be requested")
+    return fields
+
+def parse_float_arg(name):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise APIException(f"The '{name}' query parameter must be a number")
+
+def parse_sort_arg(model, numbers):
+    """?sort=<name> or ?sort=-<name> for descending, `name` must be one of `numbers`"""
+    sort = request.args.get("sort")
+    if not sort:
+        return None
+    descending = sort.startswith("-")
+    name = sort.lstrip("-")
+    if name not in numbers:
+        raise APIException(f"The results can only be sorted by {', '.join(numbers)}")
+    return getattr(model, numbers[name]), descending
+
+def collection_query(model, fields, filters=(), numbers=None, extra_columns=()):
+    """
+    Selects `fields` of `model` (plus the id and `extra_columns`, which go last so
+    zipping a row with `fields` drops them) applying the equality `filters` and,
+    for every name in `numbers`, the ?min_<name>= and ?max_<name>= ranges on
+    its numeric column.
+    """
+    columns = [getattr(model, field) for field in fields]
+    for column in [model.id, *extra_columns]:
+        if column.key not in fields:
+            columns.append(column)
+    query = model.query.with_entities(*columns)
+    for name in filters:
+        if name in request.args:
+            query = query.filter(getattr(model, name) == request.args[name])
+    for name, column_name in (numbers or {}).items():
+        column = getattr(model, column_name)
+        minimum = parse_float_arg(f"min_{name}")
+        maximum = parse_float_arg(f"max_{name}")
+        if minimum is not None:
+            query = query.filter(column >= minimum)
+        if maximum is not None:
+            query = query.filter(column <= maximum)
+    return query
+
+def wants_ndjson():
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+def stream_ndjson(model, filters=(), numbers=None):
+    """
+    Streams every row of `model` as newline delimited JSON.
+    Rows are read from the database in batches of EXPORT_BATCH_SIZE and
+    written out one line at a time, so memory does not grow with the table.
+    Accepts the same ?fields=, filters and ranges as `paginate`.
+    """
+    fields = parse_fields_arg(model)
+    statement = collection_query(model, fields, filters, numbers).order_by(model.id).statement
+
+    def generate():
+        # the body is produced after the request's session was removed, so the
+        # export uses its own connection and gives it back when the stream ends
+        with db.engine.connect() as connection:
+            result = connection.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(statement)
+            for row in result:
+                yield dumps(dict(zip(fields, row))) + b"\n"
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+def paginate(model, filters=(), numbers=None):
+    """
+    Keyset pagination over `model` ordered by id: ?after=<id>&limit=<n>
+    Only the columns asked for in ?fields= are selected and any of the
+    `filters` columns can be matched by equality (?specie=human).
+    `numbers` maps names to numeric columns that accept ?min_<name>=, ?max_<name>=
+    and ?sort=<name> / ?sort=-<name>. A sorted page skips the rows where that
+    column is NULL and its cursor is the (value, id) pair: ?after_value=&after=
+    The link to the next page travels in the `Link` header.
+    """
+    after = parse_int_arg("after", 0)
+    limit = parse_int_arg("limit", DEFAULT_PAGE_LIMIT, minimum=1, maximum=MAX_PAGE_LIMIT)
+    fields = parse_fields_arg(model)
+    sort = parse_sort_arg(model, numbers or {})
+
+    if sort is None:
+        query = collection_query(model, fields, filters, numbers)
+        query = query.filter(model.id > after).order_by(model.id)
+    else:
+        sort_column, descending = sort
+        query = collection_query(model, fields, filters, numbers, extra_columns=[sort_column])
+        query = query.filter(sort_column.isnot(None))
+        after_value = parse_float_arg("after_value")
+        if after_value is not None:
+            cursor = tuple_(sort_column, model.id)
+            query = query.filter(cursor < tuple_(after_value, after) if descending else cursor > tuple_(after_value, after))
+        if descending:
+            query = query.order_by(sort_column.desc(), model.id.desc())
+        else:
+            query = query.order_by(sort_column, model.id)
+
+    # one extra row tells us if there is a next page without a COUNT(*)
+    rows = query.limit(limit + 1).all()
+
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    response = json_response(rows_to_dicts(fields, rows))
+    if has_next and sort is None:
+        set_next_link(response, after=rows[-1].id, limit=limit)
+    elif has_next:
+        set_next_link(response, after=rows[-1].id, after_value=getattr(rows[-1], sort_column.key), limit=limit)
+    return response
+
+def set_next_link(response, **page_args):
+    """Points the `Link` header to the same URL with `page_args` replaced"""
+    next_args = request.args.to_dict()
+    next_args.update(page_args)
+    # the query string is encoded as it is, url_for would take keys like _method or _anchor as its own options
+    next_url = f"{request.script_root}{request.path}?{urlencode(next_args)}"
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+
 def has_no_empty_params(rule):
     defaults = rule.defaults if rule.defaults is not None else ()
     arguments = rule.arguments if rule.arguments is not None else ()
     return len(defaults) >= len(arguments)
 
 def generate_sitemap(app):
-    links = ['/admin/']
+    links = ['/admin/'] if 'admin.index' in app.view_functions else []
     for rule in app.url_map.iter_rules():
         # Filter out rules we can't navigate to in a browser
         # and rules that require parameters
@@ -0,0 +1,104 @@
+"""
+Validation pipeline shared by the POST handlers (single and bulk):
+1. `missing_property` checks the required properties in memory, no queries, and
+   `as_id` / `as_text` turn their values into what goes to the database.
+2. `find_taken` / `find_favorite` answer every uniqueness question with one SELECT.
+3. `insert` commits and, if a concurrent request got the same row in first, turns the
+   IntegrityError raised by the unique constraints back into the message of step 2.
+The SELECT only gives nice messages, the constraints are what keeps the data correct.
+"""
+from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError
+from models import db, User, Favorite, FAVORITE_ENTITIES
+
+def missing_property(data, required_properties, owner=""):
+    """Returns the error message of the first missing or empty property, None when `data` is fine"""
+    if not isinstance(data, dict):
+        return "The body must be an object"
+    for prop in required_properties:
+        if prop not in data: return f"The '{prop}' property{owner} is not or is not properly written"
+    for prop in required_properties:
+        if data[prop] == "": return f"The value of '{prop}' must not be empty"
+    return None
+
+def writable_properties(model, data, required_properties):
+    """
+    The properties of `data` a client may set: `required_properties` and the other public fields
+    of `model`. Ids, counters and computed columns are never taken from the body.
+    """
+    optional = [field for field in model.public_fields if field != "id" and field not in required_properties]
+    return {prop: data[prop] for prop in [*required_properties, *optional] if prop in data}
+
+def as_id(value):
+    """An id the way the single endpoints take it (1 or "1"), None for anything else"""
+    # isdecimal, isdigit also takes "²" which int() does not
+    if isinstance(value, str) and value.strip().isdecimal():
+        return int(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return None
+
+def as_text(value):
+    """Text columns take strings and numbers (stored as text), None for lists, objects, booleans and null"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return None
+
+def find_taken(model, data, unique_properties):
+    """Returns the first of `unique_properties` whose value in `data` already exists in `model`"""
+    columns = [getattr(model, prop) for prop in unique_properties]
+    rows = db.session.execute(db.select(*columns).where(
+        or_(*[column == data[prop] for prop, column in zip(unique_properties, columns)]))).all()
+    for index, prop in enumerate(unique_properties):
+        if any(row[index] == data[prop] for row in rows):
+            return prop
+    return None
+
+def find_favorite(entity_type, user_id, entity_id):
+    """
+    One SELECT for every favorite check: returns None when the user does not exist, otherwise
+    (entity name or None when the entity does not exist, True if it is already a favorite of `user_id`)
+    """
+    entity_model = FAVORITE_ENTITIES[entity_type]
+    row = db.session.execute(
+        db.select(entity_model.name, Favorite.id)
+        .select_from(User)
+        .outerjoin(entity_model, entity_model.id == entity_id)
+        .outerjoin(Favorite, and_(Favorite.user_id == User.id, Favorite.entity_type == entity_type,
+                                  Favorite.entity_id == entity_model.id))
+        .where(User.id == user_id)).first()
+    if row is None:
+        return None
+    return row.name, row.id is not None
+
+def insert(row, check):
+    """
+    Adds `row` unless `check()` returns an error message. Returns (row, None) or (None, error).
+    `row` can be a function, then it is only built once the check passed (hashing a password is not cheap).
+    `check` runs again when the INSERT hits a constraint, any other IntegrityError is raised.
+    """
+    error = check()
+    if error: return None, error
+    if callable(row): row = row()
+    db.session.add(row)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        error = check()
+        if error is None: raise
+        return None, error
+    return row, None
+
+def retry_on_conflict(create):
+    """
+    Runs `create()` (a set based bulk insert) again when a concurrent request inserted
+    one of its rows between the checks and the INSERT, the second run reports that row
+    """
+    try:
+        return create()
+    except IntegrityError:
+        db.session.rollback()
+        return create()
@@ -0,0 +1,78 @@
+"""
+Version counters and conditional GETs.
+Every write bumps the counter of the data it touches, and the ETag of a GET is
+built from those counters only, so `If-None-Match` is answered with a 304
+before the view (its query and its serializers) runs.
+"""
+from functools import wraps
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from flask import request, Response, g
+from models import db, Data_version
+from utils import wants_ndjson
+
+def current_versions(names):
+    rows = db.session.execute(db.select(Data_version.name, Data_version.version).where(Data_version.name.in_(names)))
+    versions = dict(rows.all())
+    return [versions.get(name, 0) for name in names]
+
+def bump_versions(*names):
+    """
+    Increments the counters of `names` in the transaction of the next commit, call it before the
+    write commits: the data and its counters then change together for every worker. The names
+    survive a rollback (retry_on_conflict commits on its second run) and go once they are committed.
+    """
+    db.session.info.setdefault("bump_versions", set()).update(names)
+
+@event.listens_for(Session, "before_commit")
+def write_bumped_versions(session):
+    # the savepoint below commits too, only the outer transaction writes the counters
+    if session.in_nested_transaction():
+        return
+    for name in sorted(session.info.get("bump_versions", ())):
+        updated = session.execute(
+            db.update(Data_version).where(Data_version.name == name).values(version=Data_version.version + 1))
+        if updated.rowcount == 0:
+            try:
+                with session.begin_nested():
+                    session.add(Data_version(name=name, version=1))
+            except IntegrityError:
+                # another request created it first
+                session.execute(
+                    db.update(Data_version).where(Data_version.name == name).values(version=Data_version.version + 1))
+
+@event.listens_for(Session, "after_commit")
+def forget_bumped_versions(session):
+    if not session.in_nested_transaction():
+        session.info.pop("bump_versions", None)
+
+def conditional(*names):
+    """
+    Adds a strong ETag made from the counters of `names` to a GET view and answers
+    a matching If-None-Match with 304. Names are formatted with the view arguments,
+    so "favorites:{user_id}" is the counter of one user. The counters read are left in
+    g.data_versions, the response cache keys the body on them so it always matches the ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if wants_ndjson():
+                return view(*args, **kwargs)
+            formatted_names = [name.format(**kwargs) for name in names]
+            versions = current_versions(formatted_names)
+            g.data_versions = dict(zip(formatted_names, versions))
+            etag = "-".join(f"{name}.{version}" for name, version in zip(formatted_names, versions))
+
+            # weak comparison, compressed responses carry the same ETag as a weak one (compression.py)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response, 304
+
+            response, status = view(*args, **kwargs)
+            if status == 200:
+                response.set_etag(etag)
+            return response, status
+        return wrapper
+    return decorator
@@ -0,0 +1,30 @@
+"""
+The app reads its settings from the environment when it is imported, so they are set here first:
+a throwaway SQLite file, no admin and no rate limiting.
+"""
+import os
+import sys
+import tempfile
+import pytest
+
+DATABASE_FILE = os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_FILE}"
+os.environ.setdefault("ADMIN_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from app import app as flask_app, cache
+from models import db
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+    # the counters start again from 0 with the new tables, so the cached entries would look current
+    cache.backend.entries.clear()
+    yield flask_app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,68 @@
+from models import db, User, Character
+
+def add_user():
+    user = User(email="bulk@example.com", password="x", username="bulk", is_active=True)
+    db.session.add(user)
+    db.session.add(Character(name="Luke", specie="human", height="172", gender="male"))
+    db.session.commit()
+    return user.id
+
+def test_bulk_create_reports_the_wrong_types_per_item(app, client):
+    response = client.post("/characters/bulk", json=[
+        {"name": ["Leia"], "specie": "human", "height": "150", "gender": "female"},
+        {"name": "Han", "specie": {"kind": "human"}, "height": "180", "gender": "male"},
+        {"name": "Chewbacca", "specie": "wookiee", "height": 228, "gender": "male"},
+    ])
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report[0] == {"index": 0, "Error": "The value of 'name' must be a string or a number"}
+    assert report[1] == {"index": 1, "Error": "The value of 'specie' must be a string or a number"}
+    assert report[2]["name"] == "Chewbacca" and report[2]["height"] == "228"
+
+def test_bulk_favorites_take_the_ids_the_single_endpoint_takes(app, client):
+    with app.app_context():
+        user_id = add_user()
+    response = client.post(f"/users/{user_id}/favorites/characters/bulk", json=[
+        {"character_id": "1"}, {"character_id": [1]}, {"character_id": True}])
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report[0]["character_id"] == 1
+    assert report[1] == {"index": 1, "Error": "The value of 'character_id' must be an integer id"}
+    assert report[2] == {"index": 2, "Error": "The value of 'character_id' must be an integer id"}
+
+def test_bulk_delete_reports_the_wrong_ids_per_item(app, client):
+    with app.app_context():
+        add_user()
+    response = client.delete("/characters/bulk", json={"ids": [[1], {"id": 1}, "²", "1", 2]})
+    assert response.status_code == 200
+    assert response.get_json() == [
+        {"id": [1], "Error": "The id must be an integer"},
+        {"id": {"id": 1}, "Error": "The id must be an integer"},
+        {"id": "²", "Error": "The id must be an integer"},
+        {"id": 1, "Deleted": True},
+        {"id": 2, "Deleted": False},
+    ]
+
+def test_favorites_of_a_user_that_does_not_exist_are_a_400(app, client):
+    with app.app_context():
+        add_user()
+    response = client.post("/users/999/favorites/characters", json={"user_id": 999, "character_id": 1})
+    assert response.status_code == 400
+    assert response.get_json() == {"Error": "This user's ID does not exist in the database"}
+
+    response = client.post("/users/999/favorites/characters/bulk", json=[{"character_id": 1}])
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "This user's ID does not exist in the database"
+
+def test_favorites_still_tell_the_missing_and_repeated_entities_apart(app, client):
+    with app.app_context():
+        user_id = add_user()
+    response = client.post(f"/users/{user_id}/favorites/characters", json={"user_id": user_id, "character_id": 7})
+    assert response.get_json() == {"Error": "The ID 7 does not belong to any character"}
+    assert client.post(f"/users/{user_id}/favorites/characters", json={"user_id": user_id, "character_id": 1}).status_code == 200
+    response = client.post(f"/users/{user_id}/favorites/characters", json={"user_id": user_id, "character_id": 1})
+    assert "already in the favorites list" in response.get_json()["Error"]
+
+    response = client.post(f"/users/{user_id}/favorites/characters/bulk", json=[{"character_id": 1}, {"character_id": 7}])
+    assert [entry["Error"] for entry in response.get_json()] == [
+        "The ID 1 is already in the favorites list", "The ID 7 does not exist in the database"]
@@ -0,0 +1,81 @@
+import pytest
+from models import db, Character, Data_version
+from versions import bump_versions, current_versions
+from cache import CacheBackend
+
+def add_character(name):
+    # what another worker does on POST /characters, this worker's cache only sees the database
+    db.session.add(Character(name=name, specie="human", height="172", gender="male"))
+    bump_versions("characters")
+    db.session.commit()
+
+def names(response):
+    return [row["name"] for row in response.get_json()]
+
+def test_a_write_of_another_worker_is_seen_by_the_cached_list(app, client):
+    with app.app_context():
+        add_character("Luke")
+    assert names(client.get("/characters")) == ["Luke"]
+    hits = client.get("/cache/stats").get_json()["hits"]
+    assert names(client.get("/characters")) == ["Luke"]
+    assert client.get("/cache/stats").get_json()["hits"] == hits + 1
+
+    with app.app_context():
+        add_character("Leia")
+    assert names(client.get("/characters")) == ["Luke", "Leia"]
+
+def test_a_delete_of_another_worker_is_seen_by_the_cached_list(app, client):
+    with app.app_context():
+        add_character("Luke")
+        add_character("Leia")
+    assert names(client.get("/characters")) == ["Luke", "Leia"]
+
+    with app.app_context():
+        db.session.execute(db.delete(Character).where(Character.name == "Luke"))
+        bump_versions("characters")
+        db.session.commit()
+    assert names(client.get("/characters")) == ["Leia"]
+
+def test_the_etag_and_the_cached_body_come_from_the_same_counter(app, client):
+    with app.app_context():
+        add_character("Luke")
+    first = client.get("/characters")
+    assert names(first) == ["Luke"]
+
+    with app.app_context():
+        add_character("Leia")
+    second = client.get("/characters")
+    assert second.get_etag() != first.get_etag()
+    assert names(second) == ["Luke", "Leia"]
+    assert client.get("/characters", headers={"If-None-Match": second.headers["ETag"]}).status_code == 304
+    assert client.get("/characters", headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
+
+def test_items_are_only_dropped_by_their_own_delete(app, client):
+    for name in ("Luke", "Leia", "Han"):
+        client.post("/characters", json={"name": name, "specie": "human", "height": "172", "gender": "male"})
+    luke = client.get("/characters/1")
+    client.get("/characters/2")
+
+    # a new character and the delete of another one leave Luke's cached entry and ETag as they were
+    client.post("/characters", json={"name": "Chewbacca", "specie": "wookiee", "height": "228", "gender": "male"})
+    client.delete("/characters/bulk", json={"ids": [2]})
+    hits = client.get("/cache/stats").get_json()["hits"]
+    assert client.get("/characters/1").get_etag() == luke.get_etag()
+    assert client.get("/cache/stats").get_json()["hits"] == hits + 1
+    assert client.get("/characters/1", headers={"If-None-Match": luke.headers["ETag"]}).status_code == 304
+
+    with app.app_context():
+        assert current_versions(["characters:1", "characters:2", "characters:3"]) == [0, 1, 0]
+    assert client.delete("/characters/3").status_code == 200
+    with app.app_context():
+        assert current_versions(["characters:3"]) == [1]
+    assert client.delete("/characters/99").status_code == 400
+    with app.app_context():
+        assert db.session.scalar(db.select(Data_version).where(Data_version.name == "characters:99")) is None
+
+def test_a_backend_without_set_fails_when_it_is_built():
+    class Incomplete(CacheBackend):
+        def get(self, key):
+            return None
+    with pytest.raises(TypeError):
+        Incomplete()
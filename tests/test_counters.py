@@ -0,0 +1,14 @@
+def test_the_counters_can_not_be_set_by_the_client(app, client):
+    response = client.post("/characters", json={
+        "name": "Luke", "specie": "human", "height": "172", "gender": "male", "favorites_count": 999, "id": 50})
+    assert response.status_code == 200 and response.get_json()["id"] == 1
+    assert client.get("/characters/popular").get_json() == []
+
+    response = client.post("/users", json={
+        "email": "leia@example.com", "password": "secret", "username": "leia", "is_active": True,
+        "first_name": "Leia", "favorite_characters_count": 7})
+    assert response.status_code == 200
+    user = response.get_json()
+    assert user["first_name"] == "Leia"
+    summary = client.get(f"/users/{user['id']}/favorites/summary").get_json()
+    assert (summary["characters"], summary["total"]) == (0, 0)
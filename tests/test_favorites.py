@@ -0,0 +1,26 @@
+from models import db, User
+from test_bulk import add_user
+
+def test_a_favorite_is_only_deleted_through_its_own_user(app, client):
+    with app.app_context():
+        owner = add_user()
+        other = User(email="other@example.com", password="x", username="other", is_active=True)
+        db.session.add(other)
+        db.session.commit()
+        other = other.id
+    favorite = client.post(f"/users/{owner}/favorites/characters", json={"user_id": owner, "character_id": 1}).get_json()
+
+    response = client.delete(f"/users/{other}/favorites/characters/{favorite['id']}")
+    assert response.status_code == 400
+    assert client.delete(f"/users/{owner}/favorites/characters/{favorite['id']}").status_code == 200
+
+def test_the_single_endpoints_check_the_id_type_like_the_bulk_ones(app, client):
+    with app.app_context():
+        user_id = add_user()
+    for character_id in ([1], "abc", True, {"id": 1}):
+        response = client.post(f"/users/{user_id}/favorites/characters", json={"user_id": user_id, "character_id": character_id})
+        assert response.status_code == 400
+        assert response.get_json() == {"Error": "The value of 'character_id' must be an integer id"}
+    response = client.post(f"/users/{user_id}/favorites/planets", json={"user_id": user_id, "planet_id": [1]})
+    assert response.get_json() == {"Error": "The value of 'planet_id' must be an integer id"}
+    assert client.post(f"/users/{user_id}/favorites/characters", json={"user_id": user_id, "character_id": "1"}).status_code == 200
@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from models import db, User, Character, Planet, Favorite
+
+@contextmanager
+def count_queries():
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+def add_user_with_favorites(username, characters, planets):
+    user = User(email=f"{username}@example.com", password="x", username=username, is_active=True)
+    db.session.add(user)
+    db.session.flush()
+    db.session.execute(db.insert(Favorite), [
+        {"user_id": user.id, "entity_type": "character", "entity_id": character_id} for character_id in characters] + [
+        {"user_id": user.id, "entity_type": "planet", "entity_id": planet_id} for planet_id in planets])
+    db.session.commit()
+    return user.id
+
+def test_favorites_query_count_does_not_grow_with_the_favorites(app, client):
+    with app.app_context():
+        db.session.execute(db.insert(Character), [
+            {"name": f"Character {i}", "specie": "human", "height": "170", "gender": "female"} for i in range(300)])
+        db.session.execute(db.insert(Planet), [
+            {"name": f"Planet {i}", "population": "1000", "terrain": "desert", "diameter": "100"} for i in range(300)])
+        few = add_user_with_favorites("few", range(1, 3), range(1, 3))
+        many = add_user_with_favorites("many", range(1, 301), range(1, 301))
+
+        with count_queries() as statements:
+            response = client.get(f"/users/{few}/favorites")
+        assert response.status_code == 200
+        few_queries = len(statements)
+
+        with count_queries() as statements:
+            response = client.get(f"/users/{many}/favorites")
+        assert response.status_code == 200
+        assert len(response.get_json()) == 600
+        first = response.get_json()[0]
+        assert (first["character_id"], first["character_name"]) == (1, "Character 0")
+
+    # the version counters for the ETag and the favorites with their names
+    assert len(statements) == few_queries == 2, statements
@@ -0,0 +1,23 @@
+import re
+from models import db, Character
+
+def server_timing(response):
+    return {name: float(duration) for name, duration in re.findall(r"(\w+);dur=([\d.]+)", response.headers["Server-Timing"])}
+
+def test_server_timing_splits_the_request_in_its_parts(app, client):
+    with app.app_context():
+        db.session.execute(db.insert(Character), [
+            {"name": f"Character {i}", "specie": "human", "height": "170", "gender": "female"} for i in range(100)])
+        db.session.commit()
+
+    response = client.get("/characters?limit=100", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200 and response.headers["Content-Encoding"] == "gzip"
+    timing = server_timing(response)
+    assert list(timing) == ["db", "serialize", "compress", "app", "total"]
+    assert timing["serialize"] > 0 and timing["compress"] > 0
+    # every part is rounded on its own
+    assert abs(sum(timing.values()) - 2 * timing["total"]) < 0.05
+
+def test_jsonify_counts_as_serialize(app, client):
+    timing = server_timing(client.get("/users"))
+    assert timing["serialize"] > 0 and timing["compress"] == 0
@@ -0,0 +1,25 @@
+from models import db, Character, Planet
+
+def test_the_numbers_come_from_the_text_columns(app, client):
+    response = client.post("/characters", json={
+        "name": "Luke", "specie": "human", "height": "100", "gender": "male", "height_number": 5})
+    assert response.status_code == 200
+    response = client.post("/planets", json={
+        "name": "Tatooine", "diameter": "10,465", "terrain": "desert", "population": "200000",
+        "diameter_number": 1, "population_number": None})
+    assert response.status_code == 200
+
+    assert [row["name"] for row in client.get("/characters?sort=height&min_height=50").get_json()] == ["Luke"]
+    with app.app_context():
+        planet = db.session.scalars(db.select(Planet)).one()
+        assert (planet.diameter_number, planet.population_number) == (10465, 200000)
+
+def test_an_update_recomputes_the_numbers(app):
+    with app.app_context():
+        character = Character(name="Luke", specie="human", height="100", gender="male")
+        db.session.add(character)
+        db.session.commit()
+        character.height = "172"
+        character.height_number = 5
+        db.session.commit()
+        assert character.height_number == 172
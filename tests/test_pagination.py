@@ -0,0 +1,20 @@
+from models import db, Character
+
+def add_characters(count):
+    db.session.execute(db.insert(Character), [
+        {"name": f"Character {i}", "specie": "human", "height": "170", "gender": "female"} for i in range(count)])
+    db.session.commit()
+
+def test_the_next_link_keeps_the_query_string(app, client):
+    with app.app_context():
+        add_characters(3)
+    response = client.get("/characters?limit=1&specie=human")
+    assert response.headers["Link"] == '</characters?limit=1&specie=human&after=1>; rel="next"'
+
+def test_query_args_are_not_taken_as_url_for_options(app, client):
+    with app.app_context():
+        add_characters(3)
+    response = client.get("/characters?limit=1&_method=POST&_scheme=https&_anchor=x")
+    assert response.status_code == 200
+    assert response.headers["Link"] == '</characters?limit=1&_method=POST&_scheme=https&_anchor=x&after=1>; rel="next"'
+    assert client.get("/search?q=C&limit=1&_method=POST").status_code == 200
@@ -0,0 +1,89 @@
+import threading
+import pytest
+import app as app_module
+from models import db, User
+from passwords import PasswordHasher
+from utils import APIException
+
+# cheap costs, the tests check the formats and the flow, not the strength
+CHEAP = {"scrypt_n": 2 ** 10, "pbkdf2_iterations": 1000}
+
+@pytest.mark.parametrize("algorithm, prefix", [("scrypt", "scrypt$1024$8$1$"), ("pbkdf2", "pbkdf2_sha256$1000$")])
+def test_a_hash_verifies_its_password_only(algorithm, prefix):
+    hasher = PasswordHasher(algorithm, **CHEAP)
+    stored = hasher.hash("correct horse")
+    assert stored.startswith(prefix) and "correct horse" not in stored
+    assert hasher.verify("correct horse", stored)
+    assert not hasher.verify("wrong horse", stored)
+    assert not hasher.verify(None, stored)
+    assert not hasher.needs_rehash(stored)
+
+def test_a_new_cost_needs_a_rehash():
+    stored = PasswordHasher("scrypt", **CHEAP).hash("secret")
+    stronger = PasswordHasher("scrypt", scrypt_n=2 ** 11, pbkdf2_iterations=1000)
+    assert stronger.verify("secret", stored)
+    assert stronger.needs_rehash(stored)
+    assert PasswordHasher("pbkdf2", **CHEAP).needs_rehash(stored)
+    assert stronger.needs_rehash("secret")
+
+def test_a_full_queue_answers_503():
+    hasher = PasswordHasher("scrypt", workers=1, queue=0, **CHEAP)
+    started, release = threading.Event(), threading.Event()
+    def busy():
+        started.set()
+        release.wait()
+    worker = threading.Thread(target=hasher.run, args=(busy,))
+    worker.start()
+    started.wait()
+    try:
+        with pytest.raises(APIException) as error:
+            hasher.hash("secret")
+        assert error.value.status_code == 503
+    finally:
+        release.set()
+        worker.join()
+    assert hasher.verify("secret", hasher.hash("secret"))
+
+def add_user(password):
+    user = User(email="luke@example.com", password=password, username="luke", is_active=True)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+def stored_password(user_id):
+    return db.session.get(User, user_id).password
+
+def login(client, password):
+    return client.post("/login", json={"username": "luke", "password": password})
+
+def test_login_upgrades_plain_text_and_stale_cost_passwords(app, client):
+    passwords = app_module.passwords
+    with app.app_context():
+        user_id = add_user("secret")
+    assert login(client, "wrong").status_code == 401
+    assert login(client, "secret").status_code == 200
+    with app.app_context():
+        upgraded = stored_password(user_id)
+        assert passwords.is_hash(upgraded) and not passwords.needs_rehash(upgraded)
+
+        user = db.session.get(User, user_id)
+        user.password = PasswordHasher(passwords.algorithm, **CHEAP).hash("secret")
+        db.session.commit()
+        assert passwords.needs_rehash(stored_password(user_id))
+    assert login(client, "secret").status_code == 200
+    with app.app_context():
+        assert not passwords.needs_rehash(stored_password(user_id))
+    assert login(client, "secret").status_code == 200
+
+def test_an_unknown_username_is_a_401(app, client):
+    assert login(client, "secret").status_code == 401
+
+def test_login_answers_503_when_the_hash_queue_is_full(app, client, monkeypatch):
+    with app.app_context():
+        add_user(PasswordHasher("scrypt", **CHEAP).hash("secret"))
+    busy = PasswordHasher("scrypt", workers=1, queue=0, **CHEAP)
+    busy.slots.acquire()
+    monkeypatch.setattr(app_module, "passwords", busy)
+    response = login(client, "secret")
+    assert response.status_code == 503
+    assert response.get_json()["message"] == "The server is busy, try again in a moment"
@@ -0,0 +1,49 @@
+import pytest
+from flask import Flask, jsonify, request
+from ratelimit import setup_rate_limit, MemoryBackend, RateLimitBackend
+
+def limited_app(trusted_proxies):
+    app = Flask(__name__)
+    app.config.update(RATE_LIMIT_ENABLED=True, RATE_LIMIT=0.001, RATE_LIMIT_BURST=1, RATE_LIMIT_URL=None,
+                      TRUSTED_PROXIES=trusted_proxies)
+    limiter = setup_rate_limit(app)
+
+    @app.route("/limited")
+    @limiter.limit()
+    def limited():
+        return jsonify({"client": request.remote_addr}), 200
+
+    return app.test_client()
+
+def get(client, forwarded_for):
+    return client.get("/limited", headers={"X-Forwarded-For": forwarded_for})
+
+def test_behind_a_proxy_every_client_gets_its_own_bucket():
+    client = limited_app(trusted_proxies=1)
+    first = get(client, "203.0.113.1")
+    assert first.status_code == 200 and first.get_json() == {"client": "203.0.113.1"}
+    assert get(client, "203.0.113.2").status_code == 200
+    assert get(client, "203.0.113.1").status_code == 429
+    # only the address added by the trusted proxy counts, the ones sent by the client are ignored
+    assert get(client, "198.51.100.7, 203.0.113.1").status_code == 429
+
+def test_without_trusted_proxies_the_header_is_ignored():
+    client = limited_app(trusted_proxies=0)
+    assert get(client, "203.0.113.1").status_code == 200
+    assert get(client, "203.0.113.2").status_code == 429
+
+def test_the_memory_backend_keeps_at_most_max_keys_buckets():
+    backend = MemoryBackend(max_keys=2)
+    assert backend.take("a", 0.001, 1)[0]
+    assert backend.take("b", 0.001, 1)[0]
+    assert not backend.take("a", 0.001, 1)[0]
+    # "b" is the least recently used bucket, "c" takes its place
+    assert backend.take("c", 0.001, 1)[0]
+    assert list(backend.buckets) == ["a", "c"]
+    assert not backend.take("a", 0.001, 1)[0]
+
+def test_a_backend_without_take_fails_when_it_is_built():
+    class Incomplete(RateLimitBackend):
+        pass
+    with pytest.raises(TypeError):
+        Incomplete()
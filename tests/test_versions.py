@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from models import db, Character
+from versions import bump_versions, current_versions
+
+def character(name):
+    return Character(name=name, specie="human", height="172", gender="male")
+
+def test_the_counter_is_bumped_by_the_commit_of_the_write(app):
+    with app.app_context():
+        bump_versions("characters")
+        assert current_versions(["characters"]) == [0]
+        db.session.add(character("Luke"))
+        db.session.commit()
+        assert current_versions(["characters"]) == [1]
+        # committed once, the next commit does not bump it again
+        db.session.add(character("Leia"))
+        db.session.commit()
+        assert current_versions(["characters"]) == [1]
+
+def test_a_failed_write_does_not_bump_and_its_retry_does(app):
+    with app.app_context():
+        db.session.add(character("Luke"))
+        db.session.commit()
+
+        bump_versions("characters")
+        db.session.add(character("Luke"))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+        assert current_versions(["characters"]) == [0]
+
+        db.session.add(character("Leia"))
+        db.session.commit()
+        assert current_versions(["characters"]) == [1]
+
+def test_a_rejected_request_does_not_bump(app, client):
+    client.post("/characters", json={"name": "Luke", "specie": "human", "height": "172", "gender": "male"})
+    response = client.post("/characters", json={"name": "Luke", "specie": "human", "height": "172", "gender": "male"})
+    assert response.status_code == 400
+    with app.app_context():
+        assert current_versions(["characters"]) == [1]